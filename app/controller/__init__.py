@@ -3,12 +3,13 @@ from .group_controller import router as group_router
 from .group_member_controller import router as group_member_router
 from .group_permission_controller import router as group_permission_router
 from .permission_controller import router as permission_router
-# from .product_controller import router as product_router
+from .product_controller import router as product_router
 from .user_controller import router as user_router
 from .user_permission_controller import router as user_permission_router
 from .security_controller import router as security_router
 from .s3_controller import router as s3_router
 from .bucket_controller import router as bucket_router
+from .metrics_controller import router as metrics_router
 routers = [
     security_router,
     category_router,
@@ -16,9 +17,10 @@ routers = [
     group_member_router,
     group_permission_router,
     permission_router,
-    # product_router,
+    product_router,
     user_router,
     s3_router,
     user_permission_router,
-    bucket_router
+    bucket_router,
+    metrics_router
 ]
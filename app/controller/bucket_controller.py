@@ -1,6 +1,6 @@
 # app/controller/bucket_controller.py
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from app.core.security import user_context, authorization
+from fastapi import APIRouter, HTTPException, status, Query
+from app.core.security import user_context
 from app.service.bucket_service import BucketService
 from app.schema.bucket_schema import (
     BucketCreateRequest, 
@@ -15,7 +15,6 @@ service = BucketService()
 @router.get("/buckets", response_model=list[BucketInfo], status_code=status.HTTP_200_OK)
 async def list_buckets(
     stats: bool = Query(False, description="Lấy thêm thống kê chi tiết (gọi Admin Ops, chậm hơn)"),
-    _=Depends(authorization.require_user)  # đảm bảo đã đăng nhập
 ):
     user = user_context.get()
     if not user:
@@ -27,7 +26,6 @@ async def list_buckets(
 @router.post("/buckets", response_model=BucketCreateResponse, status_code=status.HTTP_201_CREATED)
 async def create_bucket(
     req: BucketCreateRequest,
-    _=Depends(authorization.require_user)
 ):
     user = user_context.get()
     if not user:
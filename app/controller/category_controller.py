@@ -1,18 +1,25 @@
-from fastapi import APIRouter, HTTPException, Request, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from typing import List
+from pydantic import ValidationError
 from app.schema.category_schema import CategoryCreate, CategoryRead, CategoryUpdate
 from app.service.category_service import CategoryService
-# from app.service.authorization_service import AuthorizationService  # Bạn cần tự cài đặt nếu chưa có
+from app.core.security import authorization
 # from app.validators.category_validator import CategoryValidator  # Bạn cần tự cài đặt nếu chưa có
 
 # Khởi tạo các service cần thiết
 category_service = CategoryService()
-# authorization_service = AuthorizationService()
 # category_validator = CategoryValidator()
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
 
+def _validation_detail(error: Exception):
+    """Chi tiết lỗi validate theo định dạng 422 của FastAPI (payload không phải object thì trả thông báo chung)."""
+    if isinstance(error, ValidationError):
+        return error.errors(include_url=False, include_context=False)
+    return "Invalid category payload"
+
+
 @router.get("/", response_model=List[CategoryRead])
 async def list_categories():
     """
@@ -25,6 +32,16 @@ async def list_categories():
     return categories
 
 
+@router.get("/tree")
+async def get_category_tree():
+    """
+    Toàn bộ cây danh mục (mỗi node có `children`), dùng cho menu.
+    JSON được dựng sẵn một lần cho mỗi phiên bản của cây.
+    """
+    tree = await category_service.get_category_tree()
+    return Response(content=tree.tree_json, media_type="application/json")
+
+
 @router.get("/{id}", response_model=CategoryRead)
 async def get_category(id: int):
     """
@@ -39,25 +56,28 @@ async def get_category(id: int):
 async def create_category(request: Request):
     """
     Tạo danh mục mới.
-    Yêu cầu phải có thông tin người dùng (đã được attach vào request.state.user).
+    Yêu cầu phải có thông tin người dùng (đã được attach vào request.state.user) và quyền "create_category".
     """
     # Lấy thông tin user từ request (bạn cần đảm bảo middleware hoặc dependency gán user vào request.state)
     user = getattr(request.state, "user", None)
     if not user:
         # E2025: không tìm thấy thông tin user
         raise HTTPException(status_code=401, detail="E2025")
-    # if not authorization_service.check_permission(user, "create_category"):
-    #     raise HTTPException(status_code=403, detail="E2021")
+    if not await authorization.check_permission(user, "create_category"):
+        raise HTTPException(status_code=403, detail="E2021")
 
     try:
         data = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
-    # # Validate dữ liệu theo hành động 'create'
-    # validated_data: CategoryCreate = category_validator.validate_category_data(data, "create")
+    # Validate dữ liệu theo hành động 'create'
     try:
-        category = await category_service.create_category(data) #create_category(validated_data)
+        validated_data = CategoryCreate(**data)
+    except (TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=_validation_detail(e))
+    try:
+        category = await category_service.create_category(validated_data)
         return category
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -67,24 +87,26 @@ async def create_category(request: Request):
 async def update_category(id: int, request: Request):
     """
     Cập nhật danh mục.
-    Yêu cầu user phải tồn tại và có quyền "edit_category", đồng thời (theo logic PHP) user.id phải trùng với id.
+    Yêu cầu user phải tồn tại và có quyền "edit_category" cho danh mục có id được chỉ định.
     """
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="E2025")
-    # # Kiểm tra quyền: truyền thêm id nếu cần thiết
-    # if not authorization_service.check_permission(user, "edit_category", id) or getattr(user, "id", None) != id:
-    #     raise HTTPException(status_code=403, detail="E2021")
+    if not await authorization.check_permission(user, "edit_category", id):
+        raise HTTPException(status_code=403, detail="E2021")
 
     try:
         data = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
-    # Validate dữ liệu theo hành động 'update'
-    # validated_data: CategoryUpdate = category_validator.validate_category_data(data, "update")
+    # Validate dữ liệu theo hành động 'update'; id lấy theo đường dẫn
+    try:
+        validated_data = CategoryUpdate(**{**data, "id": id})
+    except (TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=_validation_detail(e))
     try:
-        category = await category_service.update_category(id, data) #.update_category(id, validated_data)
+        category = await category_service.update_category(id, validated_data)
         return category
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -99,16 +121,31 @@ async def delete_category(id: int, request: Request):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="E2025")
-    # if not authorization_service.check_permission(user, "delete_category"):
-    #     raise HTTPException(status_code=403, detail="E2021")
+    if not await authorization.check_permission(user, "delete_category"):
+        raise HTTPException(status_code=403, detail="E2021")
 
     try:
-        await category_service.delete_category(id)
-        return {"message": "Category deleted"}
+        return await category_service.delete_category(id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/{id}/descendants", response_model=List[int])
+async def get_descendants(id: int):
+    """
+    Id của toàn bộ danh mục con cháu (mọi cấp) của danh mục có id cho trước.
+    """
+    return await category_service.get_descendant_ids(id)
+
+
+@router.get("/{id}/path", response_model=List[CategoryRead])
+async def get_category_path(id: int):
+    """
+    Đường dẫn từ danh mục gốc tới danh mục có id cho trước (breadcrumb).
+    """
+    return await category_service.get_ancestor_path(id)
+
+
 @router.get("/{id}/subcategories", response_model=List[CategoryRead])
 async def get_subcategories(id: int):
     """
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException
+from app.core.security import user_context, authorization
+from app.core.database import pool_stats
+from app.core.cache import verified_token_cache, token_version_cache
+from app.core.permission_cache import permission_cache, group_membership_cache
+from app.core.password import password_hasher
+
+
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("")
+async def get_metrics():
+    """
+    Số liệu nội bộ của worker đang xử lý request (pool kết nối DB, cache, bcrypt).
+    Mỗi worker có số liệu riêng; dùng để chọn DB_POOL_SIZE/DB_MAX_OVERFLOW theo số worker.
+
+    Yêu cầu:
+      - Người dùng cần đăng nhập.
+      - Người dùng có quyền "access_admin_dashboard".
+    """
+    user_current = user_context.get()
+    if not user_current:
+        raise HTTPException(status_code=401, detail="You have not logged in")
+    if not await authorization.check_permission(user_current, "access_admin_dashboard"):
+        raise HTTPException(status_code=403, detail="You have no access to this resource")
+
+    return {
+        "db_pool": pool_stats(),
+        "caches": {
+            "verified_token": verified_token_cache.stats(),
+            "token_version": token_version_cache.stats(),
+            "permission": permission_cache.stats(),
+            "group_membership": group_membership_cache.stats(),
+        },
+        "bcrypt": password_hasher.stats(),
+    }
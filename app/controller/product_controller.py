@@ -1,29 +1,73 @@
-from fastapi import APIRouter, HTTPException, Request, status, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, Response, status, Query
+from typing import List, Literal
+from decimal import Decimal
 from app.service.product_service import ProductService
-# from app.service.authorization_service import AuthorizationService
+from app.core.product_autocomplete import product_autocomplete, MAX_SUGGESTIONS
+from app.core.security import authorization
 # from app.exception import AppException
 from app.schema.product_schema import ProductDto, ProductOptionDto
 
 router = APIRouter(prefix="/products", tags=["Product"])
 
 product_service = ProductService()
-# authorization_service = AuthorizationService()
 
 
 @router.get("", response_model=List[ProductDto])
 async def list_products(
-    page: int = Query(1, ge=1),
-    limit: int = Query(10, ge=1)
+    response: Response,
+    page: int | None = Query(None, ge=1),
+    limit: int = Query(10, ge=1),
+    cursor: str | None = Query(None),
+    sort: Literal["id", "newest"] = Query("id"),
+    min_price: Decimal | None = Query(None, ge=0),
+    max_price: Decimal | None = Query(None, ge=0),
 ):
     """
     Lấy danh sách sản phẩm theo phân trang.
 
+    Trang sau lấy bằng ?cursor=<giá trị header X-Next-Cursor của trang trước> (cùng `sort`),
+    không còn trang sau thì không có header này.
+    `page` vẫn được hỗ trợ để tương thích (OFFSET, chậm dần ở các trang sâu).
+    `min_price`/`max_price` lọc theo giá thấp nhất của sản phẩm.
     Nếu `page` hoặc `limit` không hợp lệ, sẽ trả về lỗi 400.
     """
-    if page < 1 or limit < 1:
+    if (page is not None and page < 1) or limit < 1:
         raise HTTPException(status_code=400, detail="Invalid pagination parameters")
-    products = await product_service.get_paginated_product_dtos(page, limit)
+    if page is not None and cursor is None:
+        return await product_service.get_paginated_product_dtos(page, limit, sort, min_price, max_price)
+    products, next_cursor = await product_service.get_product_dto_page(limit, cursor, sort, min_price, max_price)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return products
+
+
+@router.get("/autocomplete")
+async def autocomplete_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+):
+    """
+    Gợi ý tên sản phẩm theo tiền tố (không phân biệt dấu), sản phẩm phổ biến trước.
+    Tra cứu trong bộ nhớ, không truy vấn database.
+    """
+    return await product_autocomplete.suggest(q, limit)
+
+
+@router.get("/search", response_model=List[ProductDto])
+async def search_products(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+):
+    """
+    Tìm sản phẩm theo từ khóa, không phân biệt dấu, sắp theo độ liên quan.
+    Hỗ trợ cú pháp tìm kiếm web: "cụm từ chính xác", -loại_trừ, or.
+    Trang sau lấy bằng ?cursor=<giá trị header X-Next-Cursor của trang trước> (cùng `q`).
+    """
+    products, next_cursor = await product_service.search_products_by_keywords(q, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return products
 
 
@@ -54,8 +98,8 @@ async def create_product(request: Request):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="E2025")
-    # if not authorization_service.check_permission(user, "create_product"):
-    #     raise HTTPException(status_code=403, detail="E2021")
+    if not await authorization.check_permission(user, "create_product"):
+        raise HTTPException(status_code=403, detail="E2021")
     try:
         data = await request.json()
     except Exception:
@@ -79,8 +123,8 @@ async def update_product(request: Request, id: int):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="E2025")
-    # if not authorization_service.check_permission(user, "edit_product", id):
-    #     raise HTTPException(status_code=403, detail="E2021")
+    if not await authorization.check_permission(user, "edit_product", id):
+        raise HTTPException(status_code=403, detail="E2021")
     try:
         data = await request.json()
     except Exception:
@@ -104,8 +148,8 @@ async def delete_product(id: int, request: Request):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="E2025")
-    # if not authorization_service.check_permission(user, "delete_product"):
-    #     raise HTTPException(status_code=403, detail="E2021")
+    if not await authorization.check_permission(user, "delete_product"):
+        raise HTTPException(status_code=403, detail="E2021")
     try:
         await product_service.delete_product(id)
         return {"message": "Product deleted"}
@@ -114,15 +158,28 @@ async def delete_product(id: int, request: Request):
 
 
 @router.get("/by-category/{categoryId}", response_model=List[ProductDto])
-async def get_products_by_category(categoryId: int):
+async def get_products_by_category(
+    categoryId: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    sort: Literal["id", "newest"] = Query("id"),
+    min_price: Decimal | None = Query(None, ge=0),
+    max_price: Decimal | None = Query(None, ge=0),
+):
     """
-    Lấy danh sách sản phẩm theo category ID.
+    Lấy danh sách sản phẩm theo category ID, gồm cả sản phẩm của mọi danh mục con cháu.
+    Phân trang bằng cursor giống GET /products (header X-Next-Cursor).
 
     Nếu không tìm thấy sản phẩm nào, trả về lỗi 404.
     """
-    products = await product_service.getProductsByCategoryId(categoryId)
+    products, next_cursor = await product_service.get_product_dto_page(
+        limit, cursor, sort, min_price, max_price, category_id=categoryId
+    )
     if not products:
         raise HTTPException(status_code=404, detail="No products found for this category")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return products
 
 
@@ -139,15 +196,15 @@ async def update_attributes(request: Request, id: int):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="E2025")
-    # if not authorization_service.check_permission(user, "edit_product", id):
-    #     raise HTTPException(status_code=403, detail="E2021")
+    if not await authorization.check_permission(user, "edit_product", id):
+        raise HTTPException(status_code=403, detail="E2021")
     try:
         data = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
     try:
-        await product_service.update_or_create_product_attributes_and_options(id, data)
-        return {"message": "Attributes and options updated successfully"}
+        counts = await product_service.update_or_create_product_attributes_and_options(id, data)
+        return {"message": "Attributes and options updated successfully", **counts}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
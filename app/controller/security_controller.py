@@ -45,7 +45,8 @@ async def change_password(request: ChangePasswordRequest):
     if current_user is None:
         raise HTTPException(status_code=401, detail="You have not logged in")
     try:
-        await user_service.change_user_password(current_user, request.currentPassword, request.newPassword)
+        user = await current_user.load_user()
+        await user_service.change_user_password(user, request.currentPassword, request.newPassword)
         return {"message": "Password changed successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from app.schema.user_schema import UserCreate, UserRead, UserUpdate
+from fastapi import APIRouter, HTTPException, Response, status, Query
+from app.schema.user_schema import UserCreate, UserRead, UserUpdate, UserActiveUpdate
 from app.service.user_service import UserService
 from app.core.security import user_context, authorization
 
@@ -11,15 +11,26 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.get("/", response_model=list[UserRead])
 async def list_users(
-    page: int = Query(1, ge=1),
+    response: Response,
+    page: int | None = Query(None, ge=1),
     limit: int = Query(10, ge=1),
+    cursor: str | None = Query(None),
     ):
+    """
+    Phân trang bằng cursor: trang sau lấy bằng ?cursor=<giá trị header X-Next-Cursor của trang trước>,
+    không còn trang sau thì không có header này.
+    `page` vẫn được hỗ trợ để tương thích (OFFSET, chậm dần ở các trang sâu).
+    """
     user_current = user_context.get()
     if not user_current:
         raise HTTPException(status_code=401, detail="You have not logged in")
     if not await authorization.check_permission(user_current, "view_users"):
         raise HTTPException(status_code=403, detail="You have no access to this resource")
-    users = await user_service.get_active_users_paginated(page, limit)
+    if page is not None and cursor is None:
+        return await user_service.get_active_users_paginated(page, limit)
+    users, next_cursor = await user_service.get_active_users_page(limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return users
 
 @router.get("/me", response_model=UserRead)
@@ -27,7 +38,7 @@ async def get_current_user():
     user_current = user_context.get()
     if not user_current:
         raise HTTPException(status_code=401, detail="You have not logged in")
-    return user_current
+    return await user_current.load_user()
 
 @router.get("/{id}", response_model=UserRead)
 async def get_user(id: int):
@@ -60,6 +71,18 @@ async def update_user(
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
 
+@router.put("/{id}/active", response_model=UserRead)
+async def set_user_active(
+    id: int,
+    data: UserActiveUpdate,
+    ):
+    user_current = user_context.get()
+    if not user_current:
+        raise HTTPException(status_code=401, detail="You have not logged in")
+    if not await authorization.check_permission(user_current, "activate_deactivate_user", id):
+        raise HTTPException(status_code=403, detail="The user role is not allowed to perform this action")
+    return await user_service.set_user_active(id, data.is_active)
+
 @router.delete("/{id}", status_code=status.HTTP_200_OK)
 async def delete_user(
     id: int,
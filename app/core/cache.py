@@ -0,0 +1,139 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+from app.core import config, invalidation
+
+
+class TTLCache:
+    """
+    Cache trong bộ nhớ tiến trình:
+      - Giới hạn số entry (maxsize), vượt quá thì loại entry ít dùng nhất (LRU).
+      - Mỗi entry có thời hạn sống riêng, không vượt quá ttl của cache.
+      - Mỗi entry có thể gắn tag (vd: "uid:5") để xóa hàng loạt theo tag.
+    maxsize <= 0 nghĩa là tắt cache (set không lưu gì).
+    Chỉ dùng trong event loop (không thread-safe).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float, tuple]] = OrderedDict()
+        self._tags: dict[Hashable, set] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, *, count: bool = True) -> Any:
+        """Lấy giá trị còn hạn; entry hết hạn sẽ bị xóa."""
+        entry = self._data.get(key)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return default
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            if count:
+                self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None, tags: Iterable[Hashable] = ()) -> None:
+        """
+        Lưu giá trị. ttl (nếu có) chỉ được rút ngắn, không vượt quá ttl của cache.
+        ttl <= 0 thì không lưu.
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        if key in self._data:
+            self._remove(key)
+        tags = tuple(tags)
+        self._data[key] = (value, time.monotonic() + ttl, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> bool:
+        """Xóa một entry, trả về True nếu entry tồn tại."""
+        if key not in self._data:
+            return False
+        self._remove(key)
+        return True
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Xóa tất cả entry gắn tag, trả về số entry đã xóa."""
+        keys = self._tags.pop(tag, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def keys_for_tag(self, tag: Hashable) -> frozenset:
+        """Các key đang gắn tag (có thể gồm entry đã hết hạn nhưng chưa bị xóa)."""
+        return frozenset(self._tags.get(tag, ()))
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._tags.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+_MISSING = object()
+
+# Cache token đã xác thực: token -> payload, gắn tag "jti:<jti>" và "uid:<user_id>"
+verified_token_cache = TTLCache(config.TOKEN_CACHE_SIZE, config.TOKEN_CACHE_TTL)
+
+# Cache user_id -> token_version hiện hành (None nếu user bị khóa/không tồn tại)
+token_version_cache = TTLCache(config.TOKEN_VERSION_CACHE_SIZE, config.TOKEN_VERSION_CACHE_TTL)
+
+
+def _invalidate_token(jti: str) -> None:
+    verified_token_cache.invalidate_tag(f"jti:{jti}")
+
+
+def _invalidate_user_tokens(user_id: str) -> None:
+    verified_token_cache.invalidate_tag(f"uid:{user_id}")
+    token_version_cache.pop(int(user_id))
+
+
+def _reset_token_caches() -> None:
+    verified_token_cache.clear()
+    token_version_cache.clear()
+
+
+invalidation.register("token_jti", _invalidate_token, reset=_reset_token_caches)
+invalidation.register("user_tokens", _invalidate_user_tokens)
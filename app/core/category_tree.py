@@ -0,0 +1,125 @@
+import asyncio
+import json
+from app.core import invalidation
+from app.repository.category_repository import CategoryRepository
+
+
+class CategoryTreeSnapshot:
+    """
+    Cây danh mục bất biến, dựng một lần từ toàn bộ bảng categories.
+    Duyệt Euler (DFS) gán cho mỗi danh mục khoảng [tin, tout) trong mảng `order`:
+    con cháu của một danh mục là đoạn order[tin + 1 : tout], và a là con cháu của b
+    khi tin[b] < tin[a] < tout[b]. Đường dẫn tổ tiên và JSON của cả cây được tính sẵn.
+    Mỗi node kèm product_count (sản phẩm trực tiếp) và subtree_count (cả cây con) từ category_stats.
+    """
+    __slots__ = ("nodes", "order", "tin", "tout", "paths", "tree", "tree_json")
+
+    def __init__(self, rows):
+        """rows: (id, name, description, parent_id, product_count, subtree_count)"""
+        self.nodes = {
+            id: {
+                "id": id,
+                "name": name,
+                "description": description,
+                "parent_id": parent_id,
+                "product_count": product_count,
+                "subtree_count": subtree_count,
+            }
+            for id, name, description, parent_id, product_count, subtree_count in rows
+        }
+        children: dict[int | None, list[int]] = {}
+        for id in sorted(self.nodes):
+            parent_id = self.nodes[id]["parent_id"]
+            children.setdefault(parent_id if parent_id in self.nodes else None, []).append(id)
+
+        self.order: list[int] = []
+        self.tin: dict[int, int] = {}
+        self.tout: dict[int, int] = {}
+        self.paths: dict[int, tuple] = {}
+        self.tree: list[dict] = []
+        # Gốc là danh mục không có cha; danh mục nằm trong vòng lặp parent_id được coi như gốc
+        for root in children.get(None, ()):
+            self.tree.append(self._walk(root, children))
+        for id in sorted(self.nodes):
+            if id not in self.tin:
+                self.tree.append(self._walk(id, children))
+
+        self.tree_json = json.dumps(self.tree, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def _walk(self, root: int, children: dict) -> dict:
+        """DFS không đệ quy từ `root`, trả về node JSON của cây con."""
+        root_node = {**self.nodes[root], "children": []}
+        self.paths[root] = (root,)
+        stack = [(root, root_node, iter(children.get(root, ())))]
+        self.tin[root] = len(self.order)
+        self.order.append(root)
+        while stack:
+            id, node, pending = stack[-1]
+            child = next(pending, None)
+            while child is not None and child in self.tin:
+                child = next(pending, None)
+            if child is None:
+                self.tout[id] = len(self.order)
+                stack.pop()
+                continue
+            child_node = {**self.nodes[child], "children": []}
+            node["children"].append(child_node)
+            self.paths[child] = self.paths[id] + (child,)
+            self.tin[child] = len(self.order)
+            self.order.append(child)
+            stack.append((child, child_node, iter(children.get(child, ()))))
+        return root_node
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id in self.tin
+
+    def descendant_ids(self, category_id: int, include_self: bool = False) -> list[int]:
+        start = self.tin[category_id]
+        return self.order[start if include_self else start + 1:self.tout[category_id]]
+
+    def is_descendant(self, category_id: int, ancestor_id: int) -> bool:
+        """True nếu category_id nằm trong cây con của ancestor_id (không tính chính nó)."""
+        return self.tin[ancestor_id] < self.tin[category_id] < self.tout[ancestor_id]
+
+    def ancestor_path(self, category_id: int) -> list[dict]:
+        """Đường dẫn từ gốc tới danh mục (breadcrumb), gồm cả chính nó."""
+        return [self.nodes[id] for id in self.paths[category_id]]
+
+
+class CategoryTree:
+    """
+    Giữ snapshot cây danh mục hiện tại của worker. Mỗi lần ghi danh mục (kể cả từ worker khác,
+    qua invalidation "category_tree") chỉ đánh dấu cũ; lần đọc sau dựng snapshot mới
+    rồi thay tham chiếu một lần, request đang đọc snapshot cũ không bị ảnh hưởng.
+    """
+
+    def __init__(self):
+        self.repository = CategoryRepository()
+        self._snapshot: CategoryTreeSnapshot | None = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def mark_stale(self, key: str = "") -> None:
+        self._stale = True
+
+    async def get(self) -> CategoryTreeSnapshot:
+        if self._stale or self._snapshot is None:
+            async with self._lock:
+                if self._stale or self._snapshot is None:
+                    self._stale = False
+                    try:
+                        self._snapshot = CategoryTreeSnapshot(await self.repository.find_tree_rows())
+                    except Exception:
+                        self._stale = True
+                        raise
+        return self._snapshot
+
+
+category_tree = CategoryTree()
+
+invalidation.register("category_tree", category_tree.mark_stale, reset=category_tree.mark_stale)
+
+
+async def invalidate_category_tree() -> None:
+    """Gọi sau khi tạo/sửa/xóa danh mục hoặc số sản phẩm của danh mục thay đổi."""
+    await invalidation.publish("category_tree")
@@ -6,6 +6,18 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Replica chỉ đọc, phân tách bằng dấu phẩy (để trống = mọi truy vấn đi primary)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", 10))  # giây loại replica lỗi, cũng là chu kỳ health check
+
+# Pool kết nối của mỗi worker (tổng kết nối tối đa = số worker * (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # giây chờ tối đa để lấy kết nối
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # giây, -1 = không recycle
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))  # prepared statement cache của asyncpg, 0 = tắt (khi dùng pgbouncer)
+
 # Cấu hình bảo mật
 SECRET_KEY = os.getenv("JWT_SECRET")
 ALGORITHM = "HS256"
@@ -16,6 +28,23 @@ REFRESH_TOKEN_EXPIRE = 86400*int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 60))  #
 JWT_ISSUER = os.getenv("JWT_ISSUER", "https://scime.click")
 JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "https://shop.scime.click")
 
+# Cache token đã xác thực trong từng worker (0 = tắt cache)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 30))  # giây, tối đa cũng chỉ bằng exp của token
+# Cache token_version của từng user (dùng để thu hồi token khi khóa tài khoản)
+TOKEN_VERSION_CACHE_SIZE = int(os.getenv("TOKEN_VERSION_CACHE_SIZE", 10000))
+TOKEN_VERSION_CACHE_TTL = int(os.getenv("TOKEN_VERSION_CACHE_TTL", 30))
+
+# Cache quyền hiệu lực của từng user (0 = tắt cache, khi đó mỗi lần kiểm tra quyền là một truy vấn)
+PERMISSION_CACHE_SIZE = int(os.getenv("PERMISSION_CACHE_SIZE", 10000))
+PERMISSION_CACHE_TTL = int(os.getenv("PERMISSION_CACHE_TTL", 300))  # giây, cũng là độ trễ tối đa khi mất LISTEN/NOTIFY
+GROUP_MEMBERSHIP_CACHE_SIZE = int(os.getenv("GROUP_MEMBERSHIP_CACHE_SIZE", 10000))  # user_id -> tập group_id
+CACHE_LISTENER_HEARTBEAT = int(os.getenv("CACHE_LISTENER_HEARTBEAT", 15))  # giây
+
+# Thread pool băm mật khẩu bcrypt (số thread, số việc được phép chờ)
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 64))
+
 FERNET_KEY = os.getenv("FERNET_KEY")
 
 CEPH_ADMIN_ENDPOINT = os.getenv("CEPH_ADMIN_ENDPOINT")
@@ -24,4 +53,7 @@ CEPH_REGION = os.getenv("CEPH_REGION")
 CEPH_KEY_TYPE = os.getenv("CEPH_KEY_TYPE")
 CEPH_ADMIN_ACCESS_KEY = os.getenv("CEPH_ADMIN_ACCESS_KEY")
 CEPH_ADMIN_SECRET_KEY = os.getenv("CEPH_ADMIN_SECRET_KEY")
-CEPH_USER_CAPS = os.getenv("CEPH_USER_CAPS")
\ No newline at end of file
+CEPH_USER_CAPS = os.getenv("CEPH_USER_CAPS")
+# true: thống kê bucket bằng cách liệt kê toàn bộ object qua S3 (cách cũ, O(số object));
+# false: lấy từ RGW Admin Ops /admin/bucket?stats=true
+S3_BUCKET_STATS_ENUMERATE = os.getenv("S3_BUCKET_STATS_ENUMERATE", "false").lower() == "true"
\ No newline at end of file
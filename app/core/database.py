@@ -1,10 +1,53 @@
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from .config import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from . import config
+from .metrics import Histogram
+from .replicas import ReplicaSet
 
 
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Pool ghi nhận số request đang chờ kết nối và thời gian lấy kết nối (ms)."""
+
+    waiters = 0
+    checkout_wait = Histogram()
+
+    def _do_get(self):
+        # max_overflow=-1: overflow không giới hạn, lấy kết nối không bao giờ phải chờ (giống QueuePool._do_get)
+        waiting = self._max_overflow > -1 and self._overflow >= self._max_overflow and self._pool.empty()
+        if waiting:
+            InstrumentedPool.waiters += 1
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            InstrumentedPool.checkout_wait.observe((time.perf_counter() - start) * 1000)
+            if waiting:
+                InstrumentedPool.waiters -= 1
+
+
+_ENGINE_OPTIONS = dict(
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    connect_args={"statement_cache_size": config.DB_STATEMENT_CACHE_SIZE},
+)
+
 # Tạo engine kết nối với cơ sở dữ liệu
-engine = create_async_engine(DATABASE_URL) # thêm echo = True để bật logging SQL
+engine = create_async_engine(config.DATABASE_URL, poolclass=InstrumentedPool, **_ENGINE_OPTIONS) # thêm echo = True để bật logging SQL
+
+# Replica chỉ đọc (tùy chọn), dùng cho get_session(readonly=True)
+replicas = ReplicaSet(config.DATABASE_REPLICA_URLS, config.REPLICA_RETRY_AFTER, **_ENGINE_OPTIONS)
 
 # Tạo session factory
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
@@ -12,3 +55,189 @@ AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_com
 # Base cho các model
 Base = declarative_base()
 
+
+class _RequestSyncSession(Session):
+    pass
+
+
+@event.listens_for(_RequestSyncSession, "after_flush")
+def _mark_flush_write(session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(_RequestSyncSession, "do_orm_execute")
+def _mark_statement_write(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+class RequestSession(AsyncSession):
+    """
+    Session dùng chung cho cả một request (unit of work).
+    commit() của repository chỉ flush (vẫn phát hiện lỗi ràng buộc, refresh được),
+    commit thật chỉ xảy ra một lần ở cuối request trong DBSessionMiddleware.
+    rollback() hủy toàn bộ thay đổi của request.
+    info["wrote"] = True sau lần ghi đầu tiên: từ đó mọi lần đọc của request đều đi primary.
+    Trước lần ghi đầu tiên, connection được trả về pool sau mỗi lần đọc (release), nên request
+    không giữ connection trong lúc chờ việc khác (bcrypt, gọi HTTP ra ngoài, ...).
+    """
+    sync_session_class = _RequestSyncSession
+
+    async def commit(self) -> None:
+        await self.flush()
+
+    async def commit_request(self) -> None:
+        await super().commit()
+
+    async def release(self) -> None:
+        """
+        Kết thúc transaction chỉ đọc và trả connection về pool, nếu request chưa ghi gì
+        và không còn thay đổi chờ flush. Đối tượng đã tải vẫn dùng được (expire_on_commit=False).
+        """
+        if (
+            self.in_transaction()
+            and not self.info.get("wrote")
+            and not (self.new or self.dirty or self.deleted)
+        ):
+            await super().commit()
+
+
+RequestSessionLocal = sessionmaker(bind=engine, class_=RequestSession, expire_on_commit=False)
+
+_request_session: ContextVar[RequestSession | None] = ContextVar("request_session", default=None)
+_request_callbacks: ContextVar[list | None] = ContextVar("request_callbacks", default=None)
+_request_checkouts: ContextVar[list | None] = ContextVar("request_checkouts", default=None)
+
+# Thống kê kết nối: tổng số lần lấy connection từ pool và số request dùng session chung
+db_stats = {"checkouts": 0, "requests": 0, "request_checkouts": 0}
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    db_stats["checkouts"] += 1
+    counter = _request_checkouts.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@asynccontextmanager
+async def get_session(readonly: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    Session cho repository: trong request thì dùng lại session chung của request,
+    ngoài request (CLI, tác vụ nền) thì mở một session riêng như trước.
+    readonly=True: truy vấn chỉ đọc, chấp nhận độ trễ replication; trong request chưa ghi gì
+    thì được gửi sang replica (nếu có replica khỏe), đã ghi thì vẫn đọc primary.
+    """
+    session = _request_session.get()
+    if readonly and session is not None and replicas and not session.info.get("wrote"):
+        index = replicas.pick()
+        if index is not None:
+            async with replicas.sessions[index]() as replica_session:
+                try:
+                    yield replica_session
+                except (DBAPIError, OSError) as e:
+                    if isinstance(e, OSError) or e.connection_invalidated:
+                        replicas.mark_down(index)
+                    raise
+            return
+    if session is not None:
+        yield session
+        # Chưa ghi: không giữ transaction/connection giữa các lần đọc
+        await session.release()
+        return
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def pool_stats() -> dict:
+    """Trạng thái pool hiện tại của worker và thống kê lấy kết nối."""
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "waiters": InstrumentedPool.waiters,
+        "checkouts": db_stats["checkouts"],
+        "requests": db_stats["requests"],
+        "checkouts_per_request": round(db_stats["request_checkouts"] / db_stats["requests"], 3) if db_stats["requests"] else 0.0,
+        "checkout_wait_ms": InstrumentedPool.checkout_wait.snapshot(),
+        "replicas": replicas.stats(),
+    }
+
+
+async def after_commit(callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Chạy callback sau khi dữ liệu của request đã commit (vd: xóa cache, NOTIFY).
+    Ngoài request thì chạy ngay. Callback cũng chạy khi request bị rollback,
+    vì cache có thể đã nạp dữ liệu chưa commit trong lúc request đang chạy.
+    """
+    callbacks = _request_callbacks.get()
+    if callbacks is None:
+        await callback()
+    else:
+        callbacks.append(callback)
+
+
+class DBSessionMiddleware:
+    """
+    Mở một session chung cho mỗi request HTTP, commit một lần ngay trước khi gửi response
+    (status < 400), ngược lại rollback. Lỗi khi commit sẽ trả về 500 thay cho response gốc.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = RequestSessionLocal()
+        callbacks: list = []
+        checkouts = [0]
+        session_token = _request_session.set(session)
+        callbacks_token = _request_callbacks.set(callbacks)
+        checkouts_token = _request_checkouts.set(checkouts)
+        state = {"committed": False, "failed": False}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and not state["committed"]:
+                state["committed"] = True
+                try:
+                    if message["status"] < 400:
+                        await session.commit_request()
+                    else:
+                        await session.rollback()
+                except Exception as e:
+                    print("DB COMMIT ERR:", repr(e), flush=True)
+                    state["failed"] = True
+                    await session.rollback()
+                    response = JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+                    await response(scope, receive, send)
+                    return
+            if state["failed"]:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+            # Ghi phát sinh sau khi đã gửi response (vd: background task)
+            if state["committed"] and not state["failed"] and session.in_transaction():
+                await session.commit_request()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            _request_session.reset(session_token)
+            _request_callbacks.reset(callbacks_token)
+            _request_checkouts.reset(checkouts_token)
+            await session.close()
+            db_stats["requests"] += 1
+            db_stats["request_checkouts"] += checkouts[0]
+            for callback in callbacks:
+                try:
+                    await callback()
+                except Exception as e:
+                    print("AFTER COMMIT ERR:", repr(e), flush=True)
@@ -0,0 +1,114 @@
+import asyncio
+import uuid
+from typing import Callable
+from sqlalchemy import text
+from app.core import config
+from app.core.database import engine, AsyncSessionLocal, after_commit
+
+# Kênh Postgres LISTEN/NOTIFY dùng để báo cho các worker khác xóa cache trong bộ nhớ
+CHANNEL = "cache_invalidation"
+
+# Định danh worker hiện tại, để bỏ qua thông báo do chính worker này gửi
+_ORIGIN = uuid.uuid4().hex[:12]
+
+# kind -> handler(key); kind "*" nghĩa là xóa toàn bộ cache của handler
+_handlers: dict[str, Callable[[str], None]] = {}
+_reset_handlers: list[Callable[[], None]] = []
+_listener_task: asyncio.Task | None = None
+
+
+def register(kind: str, handler: Callable[[str], None], reset: Callable[[], None] | None = None) -> None:
+    """
+    Đăng ký handler xử lý thông báo loại `kind`.
+    reset (nếu có) được gọi khi listener mất kết nối, vì có thể đã lỡ thông báo.
+    """
+    _handlers[kind] = handler
+    if reset is not None and reset not in _reset_handlers:
+        _reset_handlers.append(reset)
+
+
+def _apply(kind: str, key: str) -> None:
+    handler = _handlers.get(kind)
+    if handler is not None:
+        handler(key)
+
+
+def _reset_all() -> None:
+    for reset in _reset_handlers:
+        reset()
+
+
+async def publish(kind: str, key: str | int = "") -> None:
+    """
+    Xóa cache ở worker hiện tại rồi NOTIFY cho các worker khác, sau khi request đã commit
+    (để không worker nào kịp nạp lại dữ liệu cũ vào cache trước lúc commit).
+    Nếu NOTIFY lỗi, các worker khác vẫn tự hết hạn cache theo TTL.
+    """
+    key = str(key)
+
+    async def _publish() -> None:
+        _apply(kind, key)
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": CHANNEL, "payload": f"{_ORIGIN}|{kind}|{key}"},
+                )
+                await session.commit()
+        except Exception as e:
+            print("CACHE NOTIFY ERR:", repr(e), flush=True)
+
+    await after_commit(_publish)
+
+
+def _on_notify(connection, pid, channel, payload: str) -> None:
+    try:
+        origin, kind, key = payload.split("|", 2)
+    except ValueError:
+        return
+    if origin != _ORIGIN:
+        _apply(kind, key)
+
+
+async def _listen_forever() -> None:
+    while True:
+        try:
+            async with engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                driver = raw.driver_connection
+                await driver.add_listener(CHANNEL, _on_notify)
+                # Có thể đã lỡ thông báo trong lúc chưa lắng nghe
+                _reset_all()
+                try:
+                    while True:
+                        await asyncio.sleep(config.CACHE_LISTENER_HEARTBEAT)
+                        # Gửi thẳng qua asyncpg: conn.exec_driver_sql sẽ mở transaction (BEGIN) không bao giờ
+                        # commit, Postgres không giao NOTIFY cho session đang trong transaction
+                        await driver.execute("SELECT 1")
+                finally:
+                    if not driver.is_closed():
+                        await driver.remove_listener(CHANNEL, _on_notify)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("CACHE LISTENER ERR:", repr(e), flush=True)
+            _reset_all()
+            await asyncio.sleep(config.CACHE_LISTENER_HEARTBEAT)
+
+
+def start_listener() -> None:
+    """Chạy listener nền (gọi khi app startup)."""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen_forever())
+
+
+async def stop_listener() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
@@ -0,0 +1,234 @@
+from bisect import bisect_left
+from app.core import config, invalidation
+from app.core.cache import TTLCache
+
+
+def _compile(rows) -> tuple:
+    """Gộp các bản ghi (target_id, is_denied) đã sắp theo id thành một rule; bản ghi đầu tiên thắng."""
+    global_decision = None
+    targets: dict[int, int] = {}
+    for target_id, is_denied in rows:
+        decision = -1 if is_denied else 1
+        if target_id is None:
+            if global_decision is None:
+                global_decision = decision
+        else:
+            targets.setdefault(target_id, decision)
+    return global_decision, targets
+
+
+def _contains(sorted_ids: tuple, target_id: int) -> bool:
+    i = bisect_left(sorted_ids, target_id)
+    return i < len(sorted_ids) and sorted_ids[i] == target_id
+
+
+class PermissionSnapshot:
+    """
+    Bảng quyền hiệu lực đã biên dịch của một user, gồm quyền riêng của user và quyền của các nhóm.
+    Chỉ chứa các bản ghi record_enabled; kết quả giống AuthorizationRepository.resolve_permission.
+
+    Quyền toàn cục được mã hóa thành bitmask, vị trí bit là permission_id:
+      - user_allow / user_deny: bản ghi toàn cục của user
+      - group_allow: OR bản ghi cho phép toàn cục của tất cả các nhóm
+    Quyền theo target nằm trong các tuple đã sắp xếp (tra bằng bisect):
+      - user_targets: permission_id -> (target được cho phép, target bị deny)
+      - group_exceptions: permission_id -> các target mà kết quả của nhóm khác với bit trong group_allow
+    """
+    __slots__ = ("user_id", "group_ids", "user_allow", "user_deny", "group_allow", "user_targets", "group_exceptions")
+
+    def __init__(
+        self,
+        user_id: int,
+        group_ids: frozenset,
+        user_allow: int,
+        user_deny: int,
+        group_allow: int,
+        user_targets: dict,
+        group_exceptions: dict,
+    ):
+        self.user_id = user_id
+        self.group_ids = group_ids
+        self.user_allow = user_allow
+        self.user_deny = user_deny
+        self.group_allow = group_allow
+        self.user_targets = user_targets
+        self.group_exceptions = group_exceptions
+
+    @classmethod
+    def build(cls, user_id: int, user_rows, group_ids, group_rows) -> "PermissionSnapshot":
+        """
+        user_rows: (permission_id, target_id, is_denied) sắp theo id
+        group_rows: (group_id, permission_id, target_id, is_denied) sắp theo id
+        """
+        by_permission: dict[int, list] = {}
+        for permission_id, target_id, is_denied in user_rows:
+            by_permission.setdefault(permission_id, []).append((target_id, is_denied))
+
+        user_allow = user_deny = 0
+        user_targets: dict[int, tuple] = {}
+        for permission_id, rows in by_permission.items():
+            global_decision, targets = _compile(rows)
+            if global_decision == 1:
+                user_allow |= 1 << permission_id
+            elif global_decision == -1:
+                user_deny |= 1 << permission_id
+            if targets:
+                user_targets[permission_id] = (
+                    tuple(sorted(t for t, d in targets.items() if d == 1)),
+                    tuple(sorted(t for t, d in targets.items() if d == -1)),
+                )
+
+        by_group: dict[tuple, list] = {}
+        for group_id, permission_id, target_id, is_denied in group_rows:
+            by_group.setdefault((permission_id, group_id), []).append((target_id, is_denied))
+        group_rules: dict[int, list] = {}
+        for (permission_id, _), rows in by_group.items():
+            group_rules.setdefault(permission_id, []).append(_compile(rows))
+
+        group_allow = 0
+        group_exceptions: dict[int, tuple] = {}
+        for permission_id, rules in group_rules.items():
+            granted = any(global_decision == 1 for global_decision, _ in rules)
+            if granted:
+                group_allow |= 1 << permission_id
+            # Chỉ các target có bản ghi riêng mới có thể đổi kết quả so với quyết định toàn cục
+            exceptions = []
+            for target_id in sorted({t for _, targets in rules for t in targets}):
+                at_target = any(targets.get(target_id, global_decision) == 1 for global_decision, targets in rules)
+                if at_target != granted:
+                    exceptions.append(target_id)
+            if exceptions:
+                group_exceptions[permission_id] = tuple(exceptions)
+
+        return cls(user_id, frozenset(group_ids), user_allow, user_deny, group_allow, user_targets, group_exceptions)
+
+    def user_decision(self, permission_id: int, target_id: int | None = None) -> int | None:
+        """1 nếu user được cấp, -1 nếu bị deny, None nếu user không có bản ghi phù hợp."""
+        if target_id is not None:
+            targets = self.user_targets.get(permission_id)
+            if targets:
+                if _contains(targets[0], target_id):
+                    return 1
+                if _contains(targets[1], target_id):
+                    return -1
+        bit = 1 << permission_id
+        if self.user_deny & bit:
+            return -1
+        if self.user_allow & bit:
+            return 1
+        return None
+
+    def group_granted(self, permission_id: int, target_id: int | None = None) -> bool:
+        """True nếu có ít nhất một nhóm cấp quyền (mỗi nhóm tự quyết định theo bản ghi của nó)."""
+        granted = bool(self.group_allow & (1 << permission_id))
+        if target_id is not None:
+            exceptions = self.group_exceptions.get(permission_id)
+            if exceptions and _contains(exceptions, target_id):
+                return not granted
+        return granted
+
+    def is_granted(self, permission_id: int, default: bool, target_id: int | None = None, is_user_owned: bool = False) -> bool:
+        """Quyết định cuối cùng, cùng thứ tự ưu tiên với AuthorizationService.check_permission."""
+        decision = self.user_decision(permission_id, target_id)
+        if decision is not None:
+            return decision > 0
+        if is_user_owned:
+            return True
+        if self.group_granted(permission_id, target_id):
+            return True
+        return default
+
+    def target_scope(self, permission_id: int, default: bool) -> tuple[bool, frozenset]:
+        """
+        Tập target được phép với một quyền, dạng rút gọn:
+          - (True, E): được phép trên mọi target, trừ các target trong E
+          - (False, A): chỉ được phép trên các target trong A
+        Chỉ các target có bản ghi riêng mới có thể khác với quyết định toàn cục.
+        """
+        special = set(self.group_exceptions.get(permission_id, ()))
+        for targets in self.user_targets.get(permission_id, ()):
+            special.update(targets)
+        everywhere = self.is_granted(permission_id, default)
+        return everywhere, frozenset(
+            t for t in special if self.is_granted(permission_id, default, t) != everywhere
+        )
+
+
+# user_id -> PermissionSnapshot, gắn tag "group:<group_id>" cho từng nhóm của user
+permission_cache = TTLCache(config.PERMISSION_CACHE_SIZE, config.PERMISSION_CACHE_TTL)
+
+# user_id -> frozenset(group_id), gắn tag "group:<group_id>": tag cũng chính là chỉ mục ngược group -> user
+group_membership_cache = TTLCache(config.GROUP_MEMBERSHIP_CACHE_SIZE, config.PERMISSION_CACHE_TTL)
+
+# Tăng mỗi lần có invalidation; snapshot tải xong mà generation đã đổi thì không lưu vào cache
+_generation = 0
+
+
+def current_generation() -> int:
+    return _generation
+
+
+def _invalidate_user(key: str) -> None:
+    global _generation
+    _generation += 1
+    permission_cache.pop(int(key))
+
+
+def _invalidate_user_groups(key: str) -> None:
+    global _generation
+    _generation += 1
+    group_membership_cache.pop(int(key))
+    permission_cache.pop(int(key))
+
+
+def _invalidate_group(key: str) -> None:
+    global _generation
+    _generation += 1
+    # Chỉ xóa snapshot của đúng các thành viên nhóm (theo chỉ mục ngược của hai cache)
+    tag = f"group:{key}"
+    for user_id in group_membership_cache.keys_for_tag(tag):
+        permission_cache.pop(user_id)
+    permission_cache.invalidate_tag(tag)
+
+
+def _invalidate_group_members(key: str) -> None:
+    _invalidate_group(key)
+    group_membership_cache.invalidate_tag(f"group:{key}")
+
+
+def _invalidate_all(key: str = "") -> None:
+    global _generation
+    _generation += 1
+    permission_cache.clear()
+    group_membership_cache.clear()
+
+
+invalidation.register("perm_user", _invalidate_user, reset=_invalidate_all)
+invalidation.register("perm_user_groups", _invalidate_user_groups)
+invalidation.register("perm_group", _invalidate_group)
+invalidation.register("perm_group_members", _invalidate_group_members)
+invalidation.register("perm_all", _invalidate_all)
+
+
+async def invalidate_user_permissions(user_id: int) -> None:
+    """Gọi sau khi quyền riêng hoặc nhóm của user thay đổi."""
+    await invalidation.publish("perm_user", user_id)
+
+
+async def invalidate_user_groups(user_id: int) -> None:
+    """Gọi sau khi user được thêm vào/xóa khỏi nhóm."""
+    await invalidation.publish("perm_user_groups", user_id)
+
+
+async def invalidate_group_members(group_id: int) -> None:
+    """Gọi sau khi xóa nhóm: xóa tập nhóm đã cache và snapshot của mọi thành viên."""
+    await invalidation.publish("perm_group_members", group_id)
+
+
+async def invalidate_group_permissions(group_id: int) -> None:
+    """Gọi sau khi quyền của nhóm thay đổi: xóa snapshot của mọi thành viên nhóm."""
+    await invalidation.publish("perm_group", group_id)
+
+
+async def invalidate_all_permissions() -> None:
+    await invalidation.publish("perm_all")
@@ -0,0 +1,57 @@
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+from app.core import invalidation
+from app.repository.permission_repository import PermissionRepository
+
+
+class PermissionEntry(NamedTuple):
+    id: int
+    name: str
+    default: bool
+
+
+class PermissionRegistry:
+    """
+    Bảng tra cứu quyền trong bộ nhớ: name -> (id, name, default).
+    Dựng một lần khi startup và dựng lại sau khi danh sách quyền thay đổi
+    (sync_permissions, tạo/sửa/xóa quyền, hoặc thông báo từ worker khác).
+    Mỗi lần dựng lại tạo mapping mới (chỉ đọc) và thay thế cả khối, không sửa tại chỗ.
+    """
+
+    def __init__(self):
+        self.repository = PermissionRepository()
+        self._by_name: Mapping[str, PermissionEntry] = MappingProxyType({})
+        self._by_id: Mapping[int, PermissionEntry] = MappingProxyType({})
+        self._loaded = False
+
+    async def refresh(self) -> None:
+        rows = await self.repository.find_all_entries()
+        entries = [PermissionEntry(id, name, bool(default)) for id, name, default in rows]
+        self._by_name = MappingProxyType({e.name: e for e in entries})
+        self._by_id = MappingProxyType({e.id: e for e in entries})
+        self._loaded = True
+
+    def mark_stale(self, key: str = "") -> None:
+        """Lần tra cứu tiếp theo sẽ tải lại từ DB."""
+        self._loaded = False
+
+    async def ensure_loaded(self) -> None:
+        if not self._loaded:
+            await self.refresh()
+
+    async def get(self, name: str) -> PermissionEntry | None:
+        await self.ensure_loaded()
+        return self._by_name.get(name)
+
+    async def get_by_id(self, id: int) -> PermissionEntry | None:
+        await self.ensure_loaded()
+        return self._by_id.get(id)
+
+    async def all(self) -> Mapping[str, PermissionEntry]:
+        await self.ensure_loaded()
+        return self._by_name
+
+
+permission_registry = PermissionRegistry()
+
+invalidation.register("permissions", permission_registry.mark_stale, reset=permission_registry.mark_stale)
@@ -0,0 +1,38 @@
+from app.model.user import User
+from app.service.user_service import UserService
+
+user_service = UserService()
+
+
+class Principal:
+    """
+    Người dùng đang đăng nhập, dựng từ claims của access token (uid, username, email, isActive).
+    Không truy vấn DB; controller cần các cột không có trong token thì gọi load_user().
+    Mỗi request có một Principal riêng nên bản ghi User đã tải không bị dùng chung giữa các request.
+    """
+    __slots__ = ("id", "username", "email", "is_active", "_user")
+
+    def __init__(self, id: int, username: str, email: str | None = None, is_active: bool = True):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.is_active = is_active
+        self._user: User | None = None
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "Principal":
+        return cls(
+            id=payload["uid"],
+            username=payload.get("username"),
+            email=payload.get("email"),
+            is_active=payload.get("isActive", True),
+        )
+
+    async def load_user(self) -> User:
+        """Tải đầy đủ bản ghi User (chỉ truy vấn một lần cho mỗi request)."""
+        if self._user is None:
+            self._user = await user_service.get_user_by_id(self.id)
+        return self._user
+
+    def __repr__(self):
+        return f"<Principal(id={self.id}, username='{self.username}')>"
@@ -0,0 +1,148 @@
+import asyncio
+import heapq
+import unicodedata
+from array import array
+from bisect import bisect_left
+from app.core import invalidation
+from app.repository.product_repository import ProductRepository
+
+# Số gợi ý tối đa mỗi lần tra cứu; kết quả của các tiền tố "rộng" được cache với đúng số này
+MAX_SUGGESTIONS = 20
+# Tiền tố khớp nhiều hơn ngưỡng này thì cache kết quả (xóa toàn bộ cache khi có thay đổi)
+_CACHE_THRESHOLD = 2048
+_CACHE_SIZE = 4096
+
+
+def _build_fold_table() -> dict[int, str]:
+    """Bảng chữ Latin có dấu (gồm toàn bộ chữ tiếng Việt) -> chữ không dấu, dùng cho str.translate."""
+    table = {ord("đ"): "d", ord("Đ"): "D"}
+    for code in (*range(0x00C0, 0x0250), *range(0x1E00, 0x1F00)):
+        base = unicodedata.normalize("NFD", chr(code))[0]
+        if base.isascii() and base != chr(code):
+            table[code] = base
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def fold(text: str) -> str:
+    """Chuẩn hóa để so khớp: bỏ dấu tiếng Việt (kể cả đ), chữ thường, gộp khoảng trắng."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text).translate(_FOLD_TABLE)
+    return " ".join(text.lower().split())
+
+
+class ProductAutocomplete:
+    """
+    Gợi ý tên sản phẩm theo tiền tố, hoàn toàn trong bộ nhớ worker.
+    Chỉ mục là mảng đã sắp xếp các khóa "<tên đã bỏ dấu>\\0<id>" cùng mảng popularity song song:
+    tiền tố khớp một đoạn liên tiếp [lo, hi) tìm bằng bisect, rồi lấy top-k theo popularity.
+    Dựng một lần khi startup; thay đổi sản phẩm (kể cả từ worker khác) đánh dấu id "bẩn",
+    lần tra cứu sau tải lại đúng các id đó từ primary.
+    """
+
+    def __init__(self):
+        self.repository = ProductRepository()
+        self._keys: list[str] = []
+        self._popularity = array("q")
+        self._names: dict[int, str] = {}
+        self._cache: dict[str, list[int]] = {}
+        self._dirty: set[int] = set()
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _key(product_id: int, name: str) -> str:
+        return f"{fold(name)}\0{product_id}"
+
+    def build(self, rows) -> None:
+        """Dựng lại toàn bộ chỉ mục từ các dòng (id, name, popularity)."""
+        entries = sorted((self._key(id, name), popularity or 0) for id, name, popularity in rows)
+        self._keys = [key for key, _ in entries]
+        self._popularity = array("q", (popularity for _, popularity in entries))
+        self._names = {id: name for id, name, _ in rows}
+        self._cache.clear()
+
+    def upsert(self, product_id: int, name: str, popularity: int | None) -> None:
+        self.remove(product_id)
+        key = self._key(product_id, name)
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._popularity.insert(position, popularity or 0)
+        self._names[product_id] = name
+        self._cache.clear()
+
+    def remove(self, product_id: int) -> None:
+        name = self._names.pop(product_id, None)
+        if name is None:
+            return
+        key = self._key(product_id, name)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+            del self._popularity[position]
+        self._cache.clear()
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            await self._rebuild()
+
+    async def _rebuild(self) -> None:
+        self._dirty.clear()
+        self._loaded = True
+        try:
+            self.build(await self.repository.find_autocomplete_rows())
+        except Exception:
+            self._loaded = False
+            raise
+
+    def mark_stale(self, key: str = "") -> None:
+        """Lần tra cứu tiếp theo sẽ dựng lại toàn bộ chỉ mục."""
+        self._loaded = False
+
+    def mark_dirty(self, key: str) -> None:
+        """Sản phẩm `key` vừa được tạo/sửa/xóa."""
+        self._dirty.add(int(key))
+
+    async def ensure_loaded(self) -> None:
+        if self._loaded and not self._dirty:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self._rebuild()
+            if self._dirty:
+                ids, self._dirty = self._dirty, set()
+                rows = await self.repository.find_autocomplete_rows(list(ids))
+                for id, name, popularity in rows:
+                    self.upsert(id, name, popularity)
+                for id in ids.difference(row[0] for row in rows):
+                    self.remove(id)
+
+    async def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Top `limit` sản phẩm có tên bắt đầu bằng `prefix` (không phân biệt dấu), popularity giảm dần."""
+        await self.ensure_loaded()
+        prefix = fold(prefix)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not prefix or limit <= 0:
+            return []
+
+        ids = self._cache.get(prefix)
+        if ids is None:
+            lo = bisect_left(self._keys, prefix)
+            hi = bisect_left(self._keys, prefix + "\uffff", lo)
+            top = heapq.nlargest(MAX_SUGGESTIONS, range(lo, hi), key=self._popularity.__getitem__)
+            ids = [int(self._keys[i].rpartition("\0")[2]) for i in top]
+            if hi - lo > _CACHE_THRESHOLD:
+                if len(self._cache) >= _CACHE_SIZE:
+                    self._cache.clear()
+                self._cache[prefix] = ids
+        return [{"id": id, "name": self._names[id]} for id in ids[:limit]]
+
+
+product_autocomplete = ProductAutocomplete()
+
+invalidation.register("product_names", product_autocomplete.mark_dirty, reset=product_autocomplete.mark_stale)
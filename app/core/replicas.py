@@ -0,0 +1,90 @@
+import asyncio
+import time
+from itertools import count
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class ReplicaSet:
+    """
+    Danh sách replica chỉ đọc, chọn lần lượt (round-robin) trong các replica đang khỏe.
+    Replica lỗi kết nối bị loại tạm thời trong `retry_after` giây; health check nền
+    (SELECT 1 định kỳ) đưa replica trở lại khi kết nối được.
+    """
+
+    def __init__(self, urls: list[str], retry_after: float, **engine_options):
+        self.engines = [create_async_engine(url, **engine_options) for url in urls]
+        self.sessions = [
+            sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+            for engine in self.engines
+        ]
+        self.retry_after = retry_after
+        self._down_until = [0.0] * len(self.engines)
+        self._counter = count()
+        self._reads = [0] * len(self.engines)
+        self._failures = [0] * len(self.engines)
+        self._task: asyncio.Task | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self) -> int | None:
+        """Chỉ số replica dùng cho lần đọc tiếp theo, None nếu không có replica nào khỏe."""
+        n = len(self.engines)
+        if not n:
+            return None
+        now = time.monotonic()
+        start = next(self._counter)
+        for i in range(n):
+            index = (start + i) % n
+            if self._down_until[index] <= now:
+                self._reads[index] += 1
+                return index
+        return None
+
+    def mark_down(self, index: int) -> None:
+        self._failures[index] += 1
+        self._down_until[index] = time.monotonic() + self.retry_after
+
+    async def check(self, index: int) -> bool:
+        try:
+            async with self.engines[index].connect() as conn:
+                await asyncio.wait_for(conn.exec_driver_sql("SELECT 1"), self.retry_after)
+            self._down_until[index] = 0.0
+            return True
+        except Exception as e:
+            print(f"REPLICA {index} DOWN:", repr(e), flush=True)
+            self.mark_down(index)
+            return False
+
+    async def _check_forever(self, interval: float) -> None:
+        while True:
+            for index in range(len(self.engines)):
+                await self.check(index)
+            await asyncio.sleep(interval)
+
+    def start_health_checks(self, interval: float) -> None:
+        if self.engines and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._check_forever(interval))
+
+    async def stop_health_checks(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "index": index,
+                "healthy": self._down_until[index] <= now,
+                "reads": self._reads[index],
+                "failures": self._failures[index],
+                "in_use": engine.sync_engine.pool.checkedout(),
+            }
+            for index, engine in enumerate(self.engines)
+        ]
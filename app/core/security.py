@@ -1,8 +1,9 @@
-from fastapi import Request, HTTPException
+from fastapi import HTTPException
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 from contextvars import ContextVar
-from app.model.user import User
+from app.core.principal import Principal
 from app.service.authentication_service import AuthenticationService
 from app.service.authorization_service import AuthorizationService
 
@@ -10,31 +11,47 @@ from app.service.authorization_service import AuthorizationService
 authentication = AuthenticationService()
 authorization = AuthorizationService()
 
-user_context: ContextVar[User | None] = ContextVar("user_context", default=None)
-payload_context: ContextVar[str | None] = ContextVar("payload_context", default=None)
+user_context: ContextVar[Principal | None] = ContextVar("user_context", default=None)
+payload_context: ContextVar[dict | None] = ContextVar("payload_context", default=None)
 
-class JWTMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        auth_header: str | None = request.headers.get("Authorization")
+class JWTMiddleware:
+    """
+    Middleware ASGI thuần (không dùng BaseHTTPMiddleware để tránh tạo task/stream phụ cho mỗi request).
+    Xác thực Bearer token một lần, lưu kết quả vào user_context/payload_context
+    và scope["state"] (đọc được qua request.state.user, request.state.payload).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        user, payload = None, None
+        auth_header: str | None = Headers(scope=scope).get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
             token = auth_header.split(" ")[1]
-            try: 
+            try:
                 user, payload = await authentication.get_current_user(token)
-                user_context.set(user)
-                payload_context.set(payload)
-                if payload['type']!='access':
-                    return JSONResponse(
-                    status_code=401,
-                    content={"detail": 'Invalid token'},
-                )
+                if payload['type'] != 'access':
+                    raise HTTPException(status_code=401, detail='Invalid token')
             except HTTPException as e:
-                return JSONResponse(
+                response = JSONResponse(
                     status_code=e.status_code,
                     content={"detail": e.detail},
                 )
-        else:
-            user_context.set(None)
-            payload_context.set(None)
+                await response(scope, receive, send)
+                return
 
-        response = await call_next(request)
-        return response
+        state = scope.setdefault("state", {})
+        state["user"] = user
+        state["payload"] = payload
+        user_token = user_context.set(user)
+        payload_token = payload_context.set(payload)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            user_context.reset(user_token)
+            payload_context.reset(payload_token)
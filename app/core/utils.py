@@ -1,5 +1,5 @@
 from fastapi.openapi.utils import get_openapi
-import secrets, string
+import base64, binascii, json, secrets, string
 import requests
 from app.core import config
 
@@ -73,4 +73,26 @@ def _rand_access_key(n: int = 20) -> str:
 def _rand_secret_key(n: int = 40) -> str:
     # a-zA-Z0-9
     alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(n))
\ No newline at end of file
+    return "".join(secrets.choice(alphabet) for _ in range(n))
+
+
+def encode_cursor(sort: str, keys: list) -> str:
+    """
+    Mã hóa vị trí của dòng cuối trang (giá trị các cột sắp xếp) thành cursor mờ cho client.
+    Giá trị datetime được lưu dạng ISO 8601.
+    """
+    keys = [k.isoformat() if hasattr(k, "isoformat") else k for k in keys]
+    raw = json.dumps({"s": sort, "k": keys}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    """Giải mã cursor do encode_cursor tạo; raise ValueError nếu cursor sai hoặc khác kiểu sắp xếp."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(data, dict) or data.get("s") != sort or not isinstance(data.get("k"), list):
+        raise ValueError("Invalid cursor")
+    return data["k"]
@@ -2,6 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.security import JWTMiddleware  # Import middleware
 from app.core.utils import custom_openapi
+from app.core import config
+from app.core.database import DBSessionMiddleware, replicas
+from app.core import invalidation
+from app.core.permission_registry import permission_registry
+from app.core.product_autocomplete import product_autocomplete
 from app.controller import routers  # Import danh sách routers
 
 app = FastAPI()
@@ -16,6 +21,42 @@ async def _print_routes():
             print("ROUTE PRINT ERR:", repr(e), flush=True)
     print("========================\n", flush=True)
 
+@app.on_event("startup")
+async def _start_cache_listener():
+    # Nhận thông báo xóa cache (quyền, token) từ các worker khác qua Postgres LISTEN/NOTIFY
+    invalidation.start_listener()
+
+@app.on_event("startup")
+async def _load_permission_registry():
+    # Nạp registry quyền một lần; nếu DB chưa sẵn sàng thì lần kiểm tra quyền đầu tiên sẽ tự nạp
+    try:
+        await permission_registry.refresh()
+    except Exception as e:
+        print("PERMISSION REGISTRY ERR:", repr(e), flush=True)
+
+@app.on_event("startup")
+async def _load_product_autocomplete():
+    # Dựng chỉ mục gợi ý tên sản phẩm; lỗi thì lần gợi ý đầu tiên sẽ tự dựng lại
+    try:
+        await product_autocomplete.refresh()
+    except Exception as e:
+        print("PRODUCT AUTOCOMPLETE ERR:", repr(e), flush=True)
+
+@app.on_event("startup")
+async def _start_replica_health_checks():
+    replicas.start_health_checks(config.REPLICA_RETRY_AFTER)
+
+@app.on_event("shutdown")
+async def _stop_cache_listener():
+    await invalidation.stop_listener()
+
+@app.on_event("shutdown")
+async def _stop_replica_health_checks():
+    await replicas.stop_health_checks()
+
+# Session/transaction dùng chung cho mỗi request (middleware trong cùng, chạy sau xác thực)
+app.add_middleware(DBSessionMiddleware)
+
 # --- Bật CORS ---
 origins = [
     "http://localhost:5173",
@@ -29,6 +70,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # cursor phân trang
 )
 
 app.add_middleware(JWTMiddleware)
@@ -4,11 +4,16 @@ from .group import Group
 from .permission import Permission
 from .group_member import GroupMember
 from .category import Category
+from .category_closure import CategoryClosure
+from .category_stats import CategoryStats
 from .group_permission import GroupPermission
 from .user_permission import UserPermission
 from .blacklist_token import BlacklistToken
 from .refresh_token import RefreshToken
 from .product_option import ProductOption
+from .product_attribute import ProductAttribute
+from .product_attribute_value import ProductAttributeValue
+from .product_option_value import ProductOptionValue
 from .s3_account import S3Account 
 from .bucket_account import BucketAccount
 # Danh sách tất cả model (dùng để import gọn)
@@ -20,10 +25,15 @@ all_models = [
     Permission,
     GroupMember,
     Category,
+    CategoryClosure,
+    CategoryStats,
     GroupPermission,
     UserPermission,
     BlacklistToken,
     RefreshToken,
     ProductOption,
+    ProductAttribute,
+    ProductAttributeValue,
+    ProductOptionValue,
     BucketAccount
 ]
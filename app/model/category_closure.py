@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from app.core.database import Base
+
+class CategoryClosure(Base):
+    __tablename__ = "category_closure"
+    __table_args__ = (
+        # Tra ngược: các tổ tiên của một danh mục
+        Index("ix_category_closure_descendant_id", "descendant_id"),
+    )
+
+    # Mọi cặp (tổ tiên, con cháu) của cây danh mục, kể cả (id, id, 0).
+    # Khóa chính (ancestor_id, descendant_id) là chỉ mục tra "mọi con cháu của danh mục"
+    ancestor_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.core.database import Base
+
+class CategoryStats(Base):
+    __tablename__ = "category_stats"
+
+    # Số sản phẩm chưa xóa của danh mục, cộng dồn khi ghi sản phẩm (CategoryRepository.adjust_product_count);
+    # tính lại toàn bộ bằng `cmd reconcile_category_stats`
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    # Sản phẩm gắn trực tiếp vào danh mục
+    product_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Sản phẩm của danh mục và mọi danh mục con cháu
+    subtree_count = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,10 +1,21 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, TIMESTAMP, ForeignKey, Index, Numeric, Computed, DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.core.database import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Phân trang keyset theo "mới nhất": (created_at, id) giảm dần
+        Index("ix_products_created_at_id", "created_at", "id"),
+        # Lọc/sắp xếp theo giá mà không cần join product_options
+        Index("ix_products_min_price_id", "min_price", "id"),
+        # Lấy sản phẩm theo danh mục (join qua category_closure), phân trang theo id
+        Index("ix_products_category_id_id", "category_id", "id"),
+        # Tìm kiếm toàn văn (websearch_to_tsquery + ts_rank)
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
     name = Column(String(300), nullable=False)
@@ -18,9 +29,40 @@ class Product(Base):
     
     popularity = Column(Integer, nullable=True)
     discount_percentage = Column(Integer, nullable=True, default=0)
+
+    # Tổng hợp từ product_options, cập nhật cùng transaction với các thao tác ghi option
+    # (ProductRepository.refresh_option_summary); dựng lại toàn bộ bằng `cmd rebuild_product_summary`
+    min_price = Column(Numeric(precision=10, scale=2), nullable=True)
+    total_stock = Column(Integer, nullable=False, default=0, server_default="0")
+    option_count = Column(Integer, nullable=False, default=0, server_default="0")
     
+    # tsvector sinh tự động từ name (trọng số A) và description (B), đã bỏ dấu tiếng Việt
+    # (deferred: chỉ dùng trong điều kiện tìm kiếm, không tải cùng sản phẩm)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', immutable_unaccent(coalesce(name, ''))), 'A') || "
+            "setweight(to_tsvector('simple', immutable_unaccent(coalesce(description, ''))), 'B')",
+            persisted=True,
+        ),
+    ))
+
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), nullable=False)
     
     is_active = Column(Boolean, default=True)
     is_delete = Column(Boolean, default=False)
+
+
+# unaccent() không IMMUTABLE nên không dùng trực tiếp được trong cột generated/index:
+# bọc lại bằng hàm IMMUTABLE với dictionary cố định, tạo trước bảng products
+event.listen(Product.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS unaccent"))
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL(
+        "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    ),
+)
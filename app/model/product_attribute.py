@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.core.database import Base
+
+class ProductAttribute(Base):
+    __tablename__ = "product_attributes"
+    __table_args__ = (
+        # Khóa tự nhiên, dùng cho INSERT ... ON CONFLICT khi upsert ma trận tùy chọn
+        Index("ux_product_attributes_product_name", "product_id", "name", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # Mỗi thuộc tính (size, màu sắc, ...) là một hàng lựa chọn của sản phẩm
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+    name = Column(String(255), nullable=False)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.core.database import Base
+
+class ProductAttributeValue(Base):
+    __tablename__ = "product_attribute_values"
+    __table_args__ = (
+        # Khóa tự nhiên, dùng cho INSERT ... ON CONFLICT khi upsert ma trận tùy chọn
+        Index("ux_product_attribute_values_attribute_value", "attribute_id", "value", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # Giá trị của một thuộc tính, vd: size 40, 41, 42
+    attribute_id = Column(Integer, ForeignKey("product_attributes.id"), nullable=False, index=True)
+    value = Column(String(255), nullable=False)
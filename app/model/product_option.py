@@ -1,12 +1,27 @@
-from sqlalchemy import Column, Integer, ForeignKey, Numeric
+import hashlib
+from sqlalchemy import Column, Integer, ForeignKey, Numeric, String, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+
+def variant_signature(attribute_value_ids) -> str:
+    """
+    Chữ ký của một tổ hợp giá trị thuộc tính: md5 của các id đã sắp xếp, nối bằng dấu phẩy.
+    Giống hệt biểu thức SQL trong ProductRepository.refresh_option_signatures.
+    """
+    return hashlib.md5(",".join(str(id) for id in sorted(attribute_value_ids)).encode()).hexdigest()
+
+
 class ProductOption(Base):
     __tablename__ = "product_options"
+    __table_args__ = (
+        # Một tổ hợp giá trị thuộc tính chỉ ứng với một option của sản phẩm
+        Index("ux_product_options_product_signature", "product_id", "variant_signature", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     price = Column(Numeric(precision=10, scale=2), nullable=True)
     stock = Column(Integer, nullable=False)
-
+    # variant_signature(...) của các product_option_values; NULL với option chưa có giá trị thuộc tính
+    variant_signature = Column(String(32), nullable=True)
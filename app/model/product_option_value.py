@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from app.core.database import Base
+
+class ProductOptionValue(Base):
+    __tablename__ = "product_option_values"
+    __table_args__ = (
+        # Khóa tự nhiên, dùng cho INSERT ... ON CONFLICT khi upsert ma trận tùy chọn
+        Index("ux_product_option_values_option_value", "option_id", "attribute_value_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    # Bảng nối nhiều-nhiều giữa product_options và product_attribute_values
+    option_id = Column(Integer, ForeignKey("product_options.id"), nullable=False, index=True)
+    attribute_value_id = Column(Integer, ForeignKey("product_attribute_values.id"), nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Boolean, TIMESTAMP
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, TIMESTAMP
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -12,5 +12,7 @@ class User(Base):
     phone = Column(String(15), nullable=True)
     address = Column(String(255), nullable=True)
     is_active = Column(Boolean, default=True)
+    # Tăng mỗi khi cần thu hồi toàn bộ token đã cấp (khóa/xóa tài khoản); token mang claim "ver"
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -0,0 +1,105 @@
+from sqlalchemy.future import select
+from sqlalchemy import case, exists, or_, nulls_last
+from app.model.permission import Permission
+from app.model.user_permission import UserPermission
+from app.model.group_permission import GroupPermission
+from app.model.group_member import GroupMember
+from app.core.database import get_session
+
+
+def _target_match(column, target_id: int | None):
+    """Bản ghi áp dụng cho target: bản ghi toàn cục (target_id NULL) hoặc đúng target_id."""
+    if target_id is None:
+        return column.is_(None)
+    return or_(column.is_(None), column == target_id)
+
+
+class AuthorizationRepository:
+    async def resolve_permission(self, user_id: int, permission_name: str, target_id: int | None = None) -> tuple | None:
+        """
+        Giải quyết quyền của user trong MỘT câu truy vấn, trả về (default, user_decision, group_granted):
+          - default: Permission.default
+          - user_decision: 1 (cho phép), -1 (bị deny) hoặc None (user không có bản ghi phù hợp)
+          - group_granted: True nếu có ít nhất một nhóm của user cấp quyền
+        Trả về None nếu permission không tồn tại.
+
+        Thứ tự ưu tiên giống UserPermissionService/GroupPermissionService.has_permission:
+        chỉ xét bản ghi record_enabled, bản ghi đúng target_id trước, bản ghi toàn cục sau
+        (target_id ASC, NULL xếp cuối như Postgres). Với nhóm, mỗi nhóm chỉ lấy bản ghi đầu tiên.
+        """
+        user_decision = (
+            select(case((UserPermission.is_denied, -1), else_=1))
+            .join(Permission, UserPermission.permission_id == Permission.id)
+            .where(UserPermission.user_id == user_id)
+            .where(Permission.name == permission_name)
+            .where(UserPermission.record_enabled == True)
+            .where(_target_match(UserPermission.target_id, target_id))
+            .order_by(nulls_last(UserPermission.target_id.asc()), UserPermission.id.asc())
+            .limit(1)
+            .correlate(None)
+            .scalar_subquery()
+        )
+
+        # Bản ghi quyết định của từng nhóm mà user thuộc về
+        group_first = (
+            select(GroupPermission.group_id, GroupPermission.is_denied)
+            .join(Permission, GroupPermission.permission_id == Permission.id)
+            .join(GroupMember, GroupMember.group_id == GroupPermission.group_id)
+            .where(GroupMember.user_id == user_id)
+            .where(Permission.name == permission_name)
+            .where(GroupPermission.record_enabled == True)
+            .where(_target_match(GroupPermission.target_id, target_id))
+            .distinct(GroupPermission.group_id)
+            .order_by(
+                GroupPermission.group_id,
+                nulls_last(GroupPermission.target_id.asc()),
+                GroupPermission.id.asc(),
+            )
+            .subquery()
+        )
+        group_granted = (
+            exists()
+            .select_from(group_first)
+            .where(group_first.c.is_denied == False)
+            .correlate(None)
+        )
+
+        async with get_session() as session:
+            result = await session.execute(
+                select(Permission.default, user_decision, group_granted)
+                .where(Permission.name == permission_name)
+            )
+            row = result.one_or_none()
+            return tuple(row) if row else None
+
+    async def load_effective_permissions(self, user_id: int, group_ids) -> tuple[list, list]:
+        """
+        Tải dữ liệu cần để dựng PermissionSnapshot của user (tối đa 2 truy vấn, cùng một session):
+          - user_rows: (permission_id, target_id, is_denied) của user_permissions đang bật
+          - group_rows: (group_id, permission_id, target_id, is_denied) của group_permissions đang bật
+            thuộc các nhóm group_ids
+        Các dòng được sắp theo id để bản ghi tạo trước được ưu tiên.
+        """
+        async with get_session() as session:
+            user_result = await session.execute(
+                select(UserPermission.permission_id, UserPermission.target_id, UserPermission.is_denied)
+                .where(UserPermission.user_id == user_id)
+                .where(UserPermission.record_enabled == True)
+                .order_by(UserPermission.id.asc())
+            )
+            user_rows = [tuple(row) for row in user_result.all()]
+            group_rows = []
+            if group_ids:
+                group_result = await session.execute(
+                    select(
+                        GroupPermission.group_id,
+                        GroupPermission.permission_id,
+                        GroupPermission.target_id,
+                        GroupPermission.is_denied,
+                    )
+                    .where(GroupPermission.group_id.in_(list(group_ids)))
+                    .where(GroupPermission.record_enabled == True)
+                    .order_by(GroupPermission.id.asc())
+                )
+                group_rows = [tuple(row) for row in group_result.all()]
+            return user_rows, group_rows
@@ -1,6 +1,6 @@
 from sqlalchemy.future import select
 from app.model.blacklist_token import BlacklistToken
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 
@@ -9,7 +9,7 @@ class BlacklistTokenRepository:
 
     async def add_token(self, token: BlacklistToken):
         """ Thêm token vào danh sách blacklist """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(token)
             await session.commit()
             await session.refresh(token)
@@ -17,7 +17,7 @@ class BlacklistTokenRepository:
 
     async def is_token_blacklisted(self, token_id: str) -> bool:
         """ Kiểm tra token có trong blacklist """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(BlacklistToken).where(BlacklistToken.id == token_id)
             )
@@ -26,7 +26,7 @@ class BlacklistTokenRepository:
 
     async def delete_token(self, token_id: str):
         """ Xóa token khỏi blacklist """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             token = await session.get(BlacklistToken, token_id)
             if token:
                 await session.delete(token)
@@ -34,7 +34,7 @@ class BlacklistTokenRepository:
 
     async def delete_expired_tokens(self):
         """ Xóa tất cả token đã hết hạn """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 await session.execute(
                     f"DELETE FROM blacklist_tokens WHERE expires_at < '{datetime.utcnow().isoformat()}'"
@@ -1,15 +1,24 @@
 from sqlalchemy.future import select
+from sqlalchemy import delete, insert, literal, update, case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.model.category import Category
-from app.core.database import AsyncSessionLocal
+from app.model.category_closure import CategoryClosure
+from app.model.category_stats import CategoryStats
+from app.model.product import Product
+from app.core.database import get_session
 from app.core.exceptions import DuplicateDataError
 
+# Độ sâu tối đa khi dựng lại closure bằng CTE đệ quy
+_MAX_DEPTH = 64
+
 
 class CategoryRepository:
 
     async def find_by_parent_id(self, parent_id: int):
         """Tìm danh mục con theo parent_id"""
-        async with AsyncSessionLocal() as session:
+        async with get_session(readonly=True) as session:
             result = await session.execute(
                 select(Category).where(Category.parent_id == parent_id)
             )
@@ -17,19 +26,38 @@ class CategoryRepository:
 
     async def find_by_id(self, category_id: int):
         """Tìm danh mục theo ID"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(select(Category).where(Category.id == category_id))
             return result.scalar_one_or_none()
 
     async def find_all(self):
         """Lấy tất cả danh mục"""
-        async with AsyncSessionLocal() as session:
+        async with get_session(readonly=True) as session:
             result = await session.execute(select(Category))
             return result.scalars().all()
 
+    async def find_tree_rows(self) -> list[tuple]:
+        """
+        (id, name, description, parent_id, product_count, subtree_count) của mọi danh mục,
+        dùng để dựng cây trong bộ nhớ. Luôn đọc primary: được gọi ngay sau khi danh mục thay đổi.
+        """
+        async with get_session() as session:
+            result = await session.execute(
+                select(
+                    Category.id,
+                    Category.name,
+                    Category.description,
+                    Category.parent_id,
+                    func.coalesce(CategoryStats.product_count, 0),
+                    func.coalesce(CategoryStats.subtree_count, 0),
+                )
+                .outerjoin(CategoryStats, CategoryStats.category_id == Category.id)
+            )
+            return [tuple(row) for row in result.all()]
+
     async def create_category(self, category: Category):
         """Tạo danh mục mới với xử lý lỗi trùng dữ liệu"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 session.add(category)
                 await session.commit()
@@ -41,15 +69,52 @@ class CategoryRepository:
 
     async def update_category(self, category: Category):
         """Cập nhật danh mục"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(category)
             await session.commit()
             await session.refresh(category)
             return category
 
+    async def delete_and_reparent(self, category_id: int, parent_id: int | None) -> dict:
+        """
+        Xóa danh mục trong một transaction bằng các câu lệnh hàng loạt:
+        danh mục con và sản phẩm của nó chuyển sang `parent_id`, cập nhật closure, rồi xóa danh mục.
+        Trả về số danh mục con / sản phẩm đã chuyển và số danh mục đã xóa.
+        """
+        async with get_session() as session:
+            children = await session.execute(
+                update(Category)
+                .where(Category.parent_id == category_id)
+                .values(parent_id=parent_id),
+                execution_options={"synchronize_session": False},
+            )
+            products = await session.execute(
+                update(Product)
+                .where(Product.category_id == category_id)
+                .values(category_id=parent_id),
+                execution_options={"synchronize_session": False},
+            )
+            # Sản phẩm gắn trực tiếp chuyển sang danh mục cha; số của cây con các tổ tiên không đổi
+            direct = (await session.execute(
+                select(CategoryStats.product_count).where(CategoryStats.category_id == category_id)
+            )).scalar() or 0
+            if direct and parent_id is not None:
+                await self._add_counts(session, select(literal(parent_id), literal(direct), literal(0)))
+            await self._remove_from_closure(session, category_id)
+            deleted = await session.execute(
+                delete(Category).where(Category.id == category_id),
+                execution_options={"synchronize_session": False},
+            )
+            await session.commit()
+            return {
+                "subcategories": children.rowcount,
+                "products": products.rowcount,
+                "deleted": deleted.rowcount,
+            }
+
     async def delete_category(self, category: Category) -> bool:
         """Xóa danh mục và trả về True nếu thành công, False nếu thất bại"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 await session.delete(category)
                 await session.commit()
@@ -57,3 +122,165 @@ class CategoryRepository:
             except SQLAlchemyError:
                 await session.rollback()
                 return False
+
+    # --- Bảng closure: mọi cặp (tổ tiên, con cháu), cập nhật cùng transaction với thao tác ghi danh mục ---
+
+    async def is_descendant(self, category_id: int, ancestor_id: int) -> bool:
+        """True nếu category_id nằm trong cây con của ancestor_id (kể cả chính nó), đọc trong transaction của request."""
+        async with get_session() as session:
+            result = await session.execute(
+                select(literal(1))
+                .where(CategoryClosure.ancestor_id == ancestor_id)
+                .where(CategoryClosure.descendant_id == category_id)
+            )
+            return result.first() is not None
+
+    async def add_to_closure(self, category_id: int, parent_id: int | None) -> None:
+        """Danh mục mới: (id, id, 0) và một dòng cho mỗi tổ tiên của danh mục cha."""
+        ancestors = select(
+            CategoryClosure.ancestor_id, literal(category_id), CategoryClosure.depth + 1
+        ).where(CategoryClosure.descendant_id == parent_id)
+        async with get_session() as session:
+            await session.execute(insert(CategoryClosure).values(ancestor_id=category_id, descendant_id=category_id, depth=0))
+            if parent_id is not None:
+                await session.execute(
+                    insert(CategoryClosure).from_select(["ancestor_id", "descendant_id", "depth"], ancestors)
+                )
+            await session.commit()
+
+    async def move_in_closure(self, category_id: int, new_parent_id: int | None) -> None:
+        """
+        Chuyển cả cây con của danh mục sang cha mới: xóa các cặp nối cây con với tổ tiên cũ,
+        thêm tích (tổ tiên của cha mới) x (cây con).
+        """
+        subtree = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+        parent_path = aliased(CategoryClosure)
+        sub_path = aliased(CategoryClosure)
+        async with get_session() as session:
+            # Số sản phẩm của cây con chuyển từ các tổ tiên cũ sang các tổ tiên mới
+            moved = (await session.execute(
+                select(CategoryStats.subtree_count).where(CategoryStats.category_id == category_id)
+            )).scalar() or 0
+            if moved:
+                await self._add_counts(session, select(
+                    CategoryClosure.ancestor_id, literal(0), literal(-moved)
+                ).where(CategoryClosure.descendant_id == category_id, CategoryClosure.depth > 0))
+            await session.execute(
+                delete(CategoryClosure)
+                .where(CategoryClosure.descendant_id.in_(subtree))
+                .where(CategoryClosure.ancestor_id.not_in(subtree)),
+                execution_options={"synchronize_session": False},
+            )
+            if new_parent_id is not None:
+                await session.execute(
+                    insert(CategoryClosure).from_select(
+                        ["ancestor_id", "descendant_id", "depth"],
+                        select(parent_path.ancestor_id, sub_path.descendant_id, parent_path.depth + sub_path.depth + 1)
+                        .where(parent_path.descendant_id == new_parent_id)
+                        .where(sub_path.ancestor_id == category_id),
+                    )
+                )
+                if moved:
+                    await self._add_counts(session, select(
+                        CategoryClosure.ancestor_id, literal(0), literal(moved)
+                    ).where(CategoryClosure.descendant_id == new_parent_id))
+            await session.commit()
+
+    @staticmethod
+    async def _remove_from_closure(session, category_id: int) -> None:
+        """
+        Bỏ một danh mục khỏi cây, các con của nó nối thẳng vào cha của nó:
+        đường đi xuyên qua danh mục ngắn đi 1, rồi xóa mọi cặp có chứa danh mục.
+        """
+        ancestors = select(CategoryClosure.ancestor_id).where(
+            CategoryClosure.descendant_id == category_id, CategoryClosure.depth > 0
+        )
+        descendants = select(CategoryClosure.descendant_id).where(
+            CategoryClosure.ancestor_id == category_id, CategoryClosure.depth > 0
+        )
+        await session.execute(
+            update(CategoryClosure)
+            .where(CategoryClosure.ancestor_id.in_(ancestors))
+            .where(CategoryClosure.descendant_id.in_(descendants))
+            .values(depth=CategoryClosure.depth - 1),
+            execution_options={"synchronize_session": False},
+        )
+        await session.execute(
+            delete(CategoryClosure).where(
+                (CategoryClosure.ancestor_id == category_id) | (CategoryClosure.descendant_id == category_id)
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+    async def rebuild_closure(self) -> None:
+        """Dựng lại toàn bộ bảng closure từ categories.parent_id (CTE đệ quy)."""
+        paths = (
+            select(Category.id.label("ancestor_id"), Category.id.label("descendant_id"), literal(0).label("depth"))
+            .cte("paths", recursive=True)
+        )
+        paths = paths.union_all(
+            select(paths.c.ancestor_id, Category.id, paths.c.depth + 1)
+            .where(Category.parent_id == paths.c.descendant_id)
+            .where(paths.c.depth < _MAX_DEPTH)  # chặn vòng lặp nếu dữ liệu parent_id bị lỗi
+        )
+        async with get_session() as session:
+            await session.execute(delete(CategoryClosure), execution_options={"synchronize_session": False})
+            await session.execute(
+                insert(CategoryClosure).from_select(
+                    ["ancestor_id", "descendant_id", "depth"],
+                    select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth),
+                )
+            )
+            await session.commit()
+
+    # --- Số sản phẩm theo danh mục (category_stats) ---
+
+    @staticmethod
+    async def _add_counts(session, deltas) -> None:
+        """Cộng dồn các dòng (category_id, product_count, subtree_count) của `deltas` vào category_stats."""
+        stmt = pg_insert(CategoryStats).from_select(["category_id", "product_count", "subtree_count"], deltas)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CategoryStats.category_id],
+                set_={
+                    "product_count": CategoryStats.product_count + stmt.excluded.product_count,
+                    "subtree_count": CategoryStats.subtree_count + stmt.excluded.subtree_count,
+                },
+            )
+        )
+
+    async def adjust_product_count(self, category_id: int | None, delta: int) -> None:
+        """
+        Thêm `delta` sản phẩm vào danh mục (số trực tiếp) và vào số cây con của nó cùng mọi tổ tiên,
+        trong một câu lệnh qua category_closure.
+        """
+        if category_id is None or not delta:
+            return
+        async with get_session() as session:
+            await self._add_counts(session, select(
+                CategoryClosure.ancestor_id,
+                case((CategoryClosure.depth == 0, delta), else_=0),
+                literal(delta),
+            ).where(CategoryClosure.descendant_id == category_id))
+            await session.commit()
+
+    async def reconcile_stats(self) -> None:
+        """Tính lại toàn bộ category_stats từ products (chưa xóa) và category_closure."""
+        counts = (
+            select(
+                CategoryClosure.ancestor_id,
+                func.count(Product.id).filter(CategoryClosure.depth == 0),
+                func.count(Product.id),
+            )
+            .outerjoin(Product, (Product.category_id == CategoryClosure.descendant_id) & (Product.is_delete == False))
+            .group_by(CategoryClosure.ancestor_id)
+        )
+        stmt = pg_insert(CategoryStats).from_select(["category_id", "product_count", "subtree_count"], counts)
+        async with get_session() as session:
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[CategoryStats.category_id],
+                    set_={"product_count": stmt.excluded.product_count, "subtree_count": stmt.excluded.subtree_count},
+                )
+            )
+            await session.commit()
@@ -5,7 +5,7 @@ from sqlalchemy.orm import joinedload  # Import joinedload
 from app.model.group_member import GroupMember
 from app.model.group import Group  # Import Group model
 from app.model.user import User  # Import User model
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 from app.core.exceptions import DuplicateDataError
 
 class GroupMemberRepository:
@@ -13,7 +13,7 @@ class GroupMemberRepository:
         """
         Thêm một GroupMember mới vào cơ sở dữ liệu với xử lý lỗi trùng dữ liệu.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 session.add(group_member)
                 await session.commit()
@@ -27,7 +27,7 @@ class GroupMemberRepository:
         """
         Xóa một GroupMember khỏi cơ sở dữ liệu và trả về True nếu thành công, False nếu thất bại.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 await session.delete(group_member)
                 await session.commit()
@@ -41,7 +41,7 @@ class GroupMemberRepository:
         Tìm kiếm một GroupMember dựa vào User và Group.
         Giả sử user và group đều có thuộc tính `id`.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(GroupMember).where(
                     GroupMember.user_id == user.id,
@@ -54,7 +54,7 @@ class GroupMemberRepository:
         """
         Tìm danh sách GroupMember (bao gồm cả Group) mà User thuộc về.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(GroupMember)
                 .where(GroupMember.user_id == user.id)
@@ -62,11 +62,21 @@ class GroupMemberRepository:
             )
             return result.scalars().all()
 
+    async def find_group_ids_by_user(self, user_id: int) -> list[int]:
+        """
+        Chỉ lấy group_id của các nhóm mà User thuộc về (không tạo đối tượng ORM).
+        """
+        async with get_session() as session:
+            result = await session.execute(
+                select(GroupMember.group_id).where(GroupMember.user_id == user_id)
+            )
+            return list(result.scalars().all())
+
     async def find_group_members_by_group(self, group) -> list[GroupMember]:
         """
         Tìm danh sách GroupMember (bao gồm cả User) của một Group.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(GroupMember)
                 .where(GroupMember.group_id == group.id)
@@ -78,7 +88,7 @@ class GroupMemberRepository:
         """
         Kiểm tra xem một User có thuộc về một Group không.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(func.count(GroupMember.id)).where(
                     GroupMember.user_id == user.id,
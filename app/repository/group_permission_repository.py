@@ -4,7 +4,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.dialects.postgresql import insert
 from app.model.permission import Permission
 from app.model.group_permission import GroupPermission
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 
 
 class GroupPermissionRepository:
@@ -13,7 +13,7 @@ class GroupPermissionRepository:
         Lấy danh sách GroupPermission theo group_id và permission_name,
         ưu tiên bản ghi có target_id = None (sắp xếp theo target_id ASC).
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(GroupPermission)
                 .join(Permission, GroupPermission.permission_id == Permission.id)
@@ -27,7 +27,7 @@ class GroupPermissionRepository:
         """
         Lấy danh sách GroupPermission theo group_id, sắp xếp theo id (tăng dần).
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(GroupPermission)
                 .where(GroupPermission.group_id == group_id)
@@ -39,7 +39,7 @@ class GroupPermissionRepository:
         """
         Thêm nhiều bản ghi GroupPermission cùng lúc, bỏ qua các bản ghi trùng lặp dựa theo unique constraint.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 records = [
                     {
@@ -64,7 +64,7 @@ class GroupPermissionRepository:
         Cập nhật nhiều bản ghi GroupPermission cùng lúc.
         Sử dụng session.merge để đảm bảo đối tượng được cập nhật đúng trong session mới.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             for gp in group_permissions:
                 await session.merge(gp)
             await session.commit()
@@ -75,7 +75,7 @@ class GroupPermissionRepository:
         Nếu có bản ghi lỗi, nó sẽ không bị xóa nhưng các bản ghi hợp lệ khác vẫn được xóa.
         Trả về danh sách các bản ghi bị lỗi khi xóa.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             failed_deletes = []
             try:
                 for gp in group_permissions:
@@ -1,18 +1,26 @@
 from sqlalchemy.future import select
 from app.model.permission import Permission
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 
 
 class PermissionRepository:
     async def find_all(self) -> list:
         """Lấy tất cả các bản ghi Permission."""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(select(Permission))
             return result.scalars().all()
 
+    async def find_all_entries(self) -> list[tuple]:
+        """Lấy (id, name, default) của tất cả Permission, không tải cả đối tượng."""
+        async with get_session() as session:
+            result = await session.execute(
+                select(Permission.id, Permission.name, Permission.default)
+            )
+            return [tuple(row) for row in result.all()]
+
     async def find(self, id: int) -> Permission:
         """Tìm Permission theo ID."""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(Permission).where(Permission.id == id)
             )
@@ -23,7 +31,7 @@ class PermissionRepository:
         Tìm một Permission theo các tiêu chí được cung cấp trong dictionary filters.
         Ví dụ: filters = {"name": "view_users"}
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             query = select(Permission)
             for attr, value in filters.items():
                 query = query.where(getattr(Permission, attr) == value)
@@ -34,7 +42,7 @@ class PermissionRepository:
         """
         Thêm mới một Permission vào cơ sở dữ liệu.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(permission)
             await session.commit()
             await session.refresh(permission)
@@ -44,7 +52,7 @@ class PermissionRepository:
         """
         Cập nhật một Permission đã có trong cơ sở dữ liệu.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(permission)
             await session.commit()
             await session.refresh(permission)
@@ -54,7 +62,7 @@ class PermissionRepository:
         """
         Xóa một Permission khỏi cơ sở dữ liệu.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             await session.delete(permission)
             await session.commit()
 
@@ -1,50 +1,98 @@
 from sqlalchemy.future import select
-from sqlalchemy import or_
+from sqlalchemy import tuple_, exists, func, case, cast, update, literal_column, String
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
 from app.model.product import Product
-from app.core.database import AsyncSessionLocal
+from app.model.category_closure import CategoryClosure
+from app.model.product_attribute import ProductAttribute
+from app.model.product_attribute_value import ProductAttributeValue
+from app.model.product_option import ProductOption, variant_signature
+from app.model.product_option_value import ProductOptionValue
+from app.core.database import get_session
 
 
 class ProductRepository:
     async def find_by_category_id(self, category_id: int) -> list:
         """Lấy danh sách sản phẩm theo ID danh mục"""
-        async with AsyncSessionLocal() as session:
+        async with get_session(readonly=True) as session:
             result = await session.execute(
                 select(Product).where(Product.category_id == category_id)
             )
             return result.scalars().all()
 
-    async def find_all_paginated(self, page: int, limit: int) -> list:
-        """Lấy danh sách sản phẩm không bị xóa với phân trang"""
+    async def find_all_paginated(self, page: int, limit: int, newest: bool = False, min_price=None, max_price=None) -> list:
+        """Lấy danh sách sản phẩm không bị xóa với phân trang (OFFSET, giữ để tương thích)"""
         offset = (page - 1) * limit
-        async with AsyncSessionLocal() as session:
+        async with get_session(readonly=True) as session:
             result = await session.execute(
-                select(Product)
-                .where(Product.is_delete == False)
-                .order_by(Product.id.asc())
+                self._listing(min_price, max_price)
+                .order_by(*self._page_order(newest))
                 .offset(offset)
                 .limit(limit)
             )
             return result.scalars().all()
 
-    async def search_products_by_keywords(self, keywords: str) -> list:
-        """Tìm sản phẩm theo từ khóa (trong tên hoặc mô tả)"""
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Product)
-                .where(Product.is_delete == False)
-                .where(
-                    or_(
-                        Product.name.ilike(f"%{keywords}%"),
-                        Product.description.ilike(f"%{keywords}%")
-                    )
-                )
-                .order_by(Product.id.asc())
+    async def find_page_after(
+        self, limit: int, after: tuple | None = None, newest: bool = False, min_price=None, max_price=None,
+        category_id: int | None = None,
+    ) -> list:
+        """
+        Phân trang keyset: chỉ đọc các dòng sau vị trí `after`, không quét lại các trang trước.
+        after: (id,) khi sắp theo id, (created_at, id) khi newest=True; None là trang đầu.
+        category_id: chỉ lấy sản phẩm thuộc danh mục này hoặc mọi danh mục con cháu của nó
+        (join qua category_closure, một truy vấn dù có bao nhiêu danh mục con).
+        """
+        stmt = self._listing(min_price, max_price)
+        if category_id is not None:
+            stmt = stmt.join(CategoryClosure, CategoryClosure.descendant_id == Product.category_id).where(
+                CategoryClosure.ancestor_id == category_id
             )
+        if after is not None:
+            if newest:
+                stmt = stmt.where(tuple_(Product.created_at, Product.id) < tuple_(*after))
+            else:
+                stmt = stmt.where(Product.id > after[0])
+        async with get_session(readonly=True) as session:
+            result = await session.execute(stmt.order_by(*self._page_order(newest)).limit(limit))
             return result.scalars().all()
 
+    @staticmethod
+    def _listing(min_price=None, max_price=None):
+        """Sản phẩm chưa xóa, lọc theo khoảng giá trên cột min_price (không cần join product_options)"""
+        stmt = select(Product).where(Product.is_delete == False)
+        if min_price is not None:
+            stmt = stmt.where(Product.min_price >= min_price)
+        if max_price is not None:
+            stmt = stmt.where(Product.min_price <= max_price)
+        return stmt
+
+    @staticmethod
+    def _page_order(newest: bool) -> tuple:
+        if newest:
+            return Product.created_at.desc(), Product.id.desc()
+        return (Product.id.asc(),)
+
+    async def search_products_by_keywords(self, keywords: str, limit: int, after: tuple | None = None) -> list[tuple]:
+        """
+        Tìm sản phẩm theo từ khóa bằng full-text search (không phân biệt dấu),
+        cú pháp websearch ("cụm từ", -loại trừ, or), sắp theo độ liên quan.
+        after: (rank, id) của dòng cuối trang trước; trả về [(Product, rank)].
+        """
+        query = func.websearch_to_tsquery("simple", func.immutable_unaccent(keywords))
+        rank = func.ts_rank(Product.search_vector, query)
+        stmt = (
+            select(Product, rank)
+            .where(Product.is_delete == False)
+            .where(Product.search_vector.op("@@")(query))
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(rank, Product.id) < tuple_(*after))
+        async with get_session(readonly=True) as session:
+            result = await session.execute(stmt.order_by(rank.desc(), Product.id.desc()).limit(limit))
+            return [tuple(row) for row in result.all()]
+
     async def find_by_id(self, product_id: int):
         """Tìm sản phẩm theo ID"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(Product).where(Product.id == product_id)
             )
@@ -52,7 +100,7 @@ class ProductRepository:
 
     async def find_all(self) -> list:
         """Lấy tất cả sản phẩm"""
-        async with AsyncSessionLocal() as session:
+        async with get_session(readonly=True) as session:
             result = await session.execute(select(Product))
             return result.scalars().all()
 
@@ -60,7 +108,7 @@ class ProductRepository:
 
     async def create(self, product: Product) -> Product:
         """Tạo mới một sản phẩm trong cơ sở dữ liệu"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(product)
             await session.commit()
             await session.refresh(product)
@@ -71,8 +119,252 @@ class ProductRepository:
         Cập nhật thông tin của sản phẩm.
         Ở đây, chúng ta add lại đối tượng (có thể đã được thay đổi) rồi commit và refresh.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(product)
             await session.commit()
             await session.refresh(product)
             return product
+
+    async def find_autocomplete_rows(self, product_ids: list[int] | None = None) -> list[tuple]:
+        """
+        (id, name, popularity) của các sản phẩm chưa xóa, dùng cho chỉ mục gợi ý tên.
+        Luôn đọc primary: được gọi ngay sau thông báo thay đổi, replica có thể chưa kịp cập nhật.
+        """
+        stmt = select(Product.id, Product.name, Product.popularity).where(Product.is_delete == False)
+        if product_ids is not None:
+            stmt = stmt.where(Product.id.in_(product_ids))
+        async with get_session() as session:
+            result = await session.execute(stmt)
+            return [tuple(row) for row in result.all()]
+
+    async def reload(self, product: Product) -> Product:
+        """Nạp lại các cột của sản phẩm từ DB (vd: sau refresh_option_summary)"""
+        async with get_session() as session:
+            session.add(product)
+            await session.refresh(product)
+            return product
+
+    async def load_attribute_rows(self, product_ids: list[int]) -> list[tuple]:
+        """
+        Tải thuộc tính của cả một trang sản phẩm trong 1 truy vấn (không phụ thuộc số sản phẩm):
+        (product_id, attribute_id, attribute_name, value | None), sắp theo id
+        """
+        if not product_ids:
+            return []
+        async with get_session(readonly=True) as session:
+            result = await session.execute(
+                select(
+                    ProductAttribute.product_id,
+                    ProductAttribute.id,
+                    ProductAttribute.name,
+                    ProductAttributeValue.value,
+                )
+                .outerjoin(ProductAttributeValue, ProductAttributeValue.attribute_id == ProductAttribute.id)
+                .where(ProductAttribute.product_id.in_(product_ids))
+                .order_by(ProductAttribute.id.asc(), ProductAttributeValue.id.asc())
+            )
+            return [tuple(row) for row in result.all()]
+
+    async def find_option_by_signature(self, product_id: int, signature: str | None) -> ProductOption | None:
+        """
+        Option của sản phẩm ứng với một tổ hợp giá trị thuộc tính (tra qua unique index).
+        signature=None: option mặc định chưa có giá trị thuộc tính nào (variant_signature NULL).
+        """
+        query = select(ProductOption).where(ProductOption.product_id == product_id)
+        if signature is None:
+            # NULL không bị unique index ràng buộc nên có thể có nhiều option như vậy, lấy option cũ nhất
+            query = query.where(ProductOption.variant_signature.is_(None)).order_by(ProductOption.id).limit(1)
+        else:
+            query = query.where(ProductOption.variant_signature == signature)
+        async with get_session() as session:
+            result = await session.execute(query)
+            return result.scalar_one_or_none()
+
+    async def find_attribute_value_ids(self, product_id: int, names) -> list[tuple]:
+        """
+        (tên thuộc tính, giá trị, attribute_value_id) của sản phẩm cho các thuộc tính `names`, trong 1 truy vấn.
+        Thuộc tính chưa có giá trị nào trả về một dòng (tên, None, None).
+        """
+        async with get_session() as session:
+            result = await session.execute(
+                select(ProductAttribute.name, ProductAttributeValue.value, ProductAttributeValue.id)
+                .outerjoin(ProductAttributeValue, ProductAttributeValue.attribute_id == ProductAttribute.id)
+                .where(ProductAttribute.product_id == product_id)
+                .where(ProductAttribute.name.in_(list(names)))
+            )
+            return [tuple(row) for row in result.all()]
+
+    async def upsert_variant_matrix(self, product_id: int, attributes: list[str], variants: dict) -> dict:
+        """
+        Ghi toàn bộ ma trận tùy chọn của sản phẩm theo kiểu set-based, trong cùng một session/transaction:
+          1. đọc một lần thuộc tính, giá trị và option hiện có của sản phẩm
+          2. INSERT ... ON CONFLICT DO NOTHING các thuộc tính / giá trị còn thiếu (mỗi bảng 1 câu lệnh)
+          3. so sánh trong bộ nhớ theo variant_signature: UPDATE hàng loạt option đổi giá/tồn kho,
+             INSERT ... ON CONFLICT option mới cùng liên kết option - giá trị của chúng
+        attributes: tên thuộc tính theo thứ tự cột
+        variants: {tuple giá trị (theo thứ tự attributes): (price, stock)}
+        Trả về số option inserted / updated / unchanged.
+        """
+        async with get_session() as session:
+            attribute_ids = await self._ensure_rows(
+                session,
+                ProductAttribute,
+                ("name",),
+                [{"product_id": product_id, "name": name} for name in attributes],
+                ProductAttribute.product_id == product_id,
+            )
+            value_ids = await self._ensure_rows(
+                session,
+                ProductAttributeValue,
+                ("attribute_id", "value"),
+                [
+                    {"attribute_id": attribute_ids[(name,)], "value": value}
+                    for name, value in {(name, values[i]) for values in variants for i, name in enumerate(attributes)}
+                ],
+                ProductAttributeValue.attribute_id.in_(list(attribute_ids.values())),
+            )
+
+            result = await session.execute(
+                select(ProductOption.variant_signature, ProductOption.id, ProductOption.price, ProductOption.stock)
+                .where(ProductOption.product_id == product_id)
+                .where(ProductOption.variant_signature.is_not(None))
+            )
+            existing = {signature: (id, price, stock) for signature, id, price, stock in result.all()}
+
+            new_options, changed, links = [], [], {}
+            for values, (price, stock) in variants.items():
+                ids = [value_ids[(attribute_ids[(name,)], values[i])] for i, name in enumerate(attributes)]
+                signature = variant_signature(ids)
+                current = existing.get(signature)
+                if current is None:
+                    new_options.append({"product_id": product_id, "price": price, "stock": stock, "variant_signature": signature})
+                    links[signature] = ids
+                elif (current[1], current[2]) != (price, stock):
+                    changed.append({"id": current[0], "price": price, "stock": stock})
+
+            if changed:
+                # UPDATE theo khóa chính, gửi theo lô (executemany)
+                await session.execute(update(ProductOption), changed)
+
+            inserted = {}
+            if new_options:
+                stmt = pg_insert(ProductOption).values(new_options)
+                result = await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["product_id", "variant_signature"],
+                        set_={"price": stmt.excluded.price, "stock": stmt.excluded.stock},
+                    ).returning(ProductOption.variant_signature, ProductOption.id)
+                )
+                inserted = dict(result.all())
+                await session.execute(
+                    pg_insert(ProductOptionValue)
+                    .values([
+                        {"option_id": option_id, "attribute_value_id": value_id}
+                        for signature, option_id in inserted.items()
+                        for value_id in links[signature]
+                    ])
+                    .on_conflict_do_nothing()
+                )
+
+            await session.commit()
+            return {
+                "inserted": len(inserted),
+                "updated": len(changed),
+                "unchanged": len(variants) - len(inserted) - len(changed),
+            }
+
+    @staticmethod
+    async def _ensure_rows(session, model, key_columns: tuple, rows: list[dict], scope) -> dict:
+        """
+        Đảm bảo các dòng `rows` tồn tại (INSERT ... ON CONFLICT DO NOTHING cho dòng còn thiếu),
+        trả về {tuple giá trị key_columns: id} của mọi dòng trong phạm vi `scope`.
+        """
+        columns = [getattr(model, name) for name in key_columns]
+        result = await session.execute(select(*columns, model.id).where(scope))
+        ids = {tuple(row[:-1]): row[-1] for row in result.all()}
+        key = lambda row: tuple(row[name] for name in key_columns)
+        missing = [row for row in rows if key(row) not in ids]
+        if missing:
+            result = await session.execute(
+                pg_insert(model).values(missing).on_conflict_do_nothing().returning(*columns, model.id)
+            )
+            ids.update({tuple(row[:-1]): row[-1] for row in result.all()})
+            if any(key(row) not in ids for row in missing):
+                # Dòng do request khác vừa chèn (ON CONFLICT không trả về): đọc lại
+                result = await session.execute(select(*columns, model.id).where(scope))
+                ids = {tuple(row[:-1]): row[-1] for row in result.all()}
+        return ids
+
+    async def refresh_option_signatures(self, product_ids: list[int] | None = None) -> None:
+        """
+        Tính lại variant_signature của các option từ product_option_values
+        (product_ids=None: tất cả), cùng công thức với variant_signature() bên Python.
+        """
+        signatures = (
+            select(
+                ProductOptionValue.option_id,
+                func.md5(
+                    func.string_agg(
+                        cast(ProductOptionValue.attribute_value_id, String),
+                        aggregate_order_by(literal_column("','"), ProductOptionValue.attribute_value_id),
+                    )
+                ).label("signature"),
+            )
+            .group_by(ProductOptionValue.option_id)
+        )
+        if product_ids is not None:
+            signatures = signatures.join(ProductOption, ProductOption.id == ProductOptionValue.option_id).where(
+                ProductOption.product_id.in_(product_ids)
+            )
+        signatures = signatures.subquery()
+
+        async with get_session() as session:
+            await session.execute(
+                update(ProductOption)
+                .where(ProductOption.id == signatures.c.option_id)
+                .values(variant_signature=signatures.c.signature),
+                execution_options={"synchronize_session": False},
+            )
+            await session.commit()
+
+    async def refresh_option_summary(self, product_ids: list[int] | None = None) -> None:
+        """
+        Tính lại min_price, total_stock, option_count của sản phẩm từ product_options
+        (product_ids=None: tất cả sản phẩm). Chạy trong session của request nên cùng transaction
+        với thao tác ghi option. Quy tắc: chỉ có một option thì dùng luôn option đó,
+        ngược lại chỉ tính các option có option value.
+        """
+        has_values = exists().where(ProductOptionValue.option_id == ProductOption.id)
+        single = func.count() == 1
+        summary = (
+            select(
+                ProductOption.product_id,
+                case((single, func.min(ProductOption.price)), else_=func.min(ProductOption.price).filter(has_values)).label("min_price"),
+                case((single, func.sum(ProductOption.stock)), else_=func.coalesce(func.sum(ProductOption.stock).filter(has_values), 0)).label("total_stock"),
+                func.count().label("option_count"),
+            )
+            .group_by(ProductOption.product_id)
+        )
+        empty = update(Product).where(~exists().where(ProductOption.product_id == Product.id))
+        if product_ids is not None:
+            summary = summary.where(ProductOption.product_id.in_(product_ids))
+            empty = empty.where(Product.id.in_(product_ids))
+        summary = summary.subquery()
+
+        async with get_session() as session:
+            await session.execute(
+                update(Product)
+                .where(Product.id == summary.c.product_id)
+                .values(
+                    min_price=summary.c.min_price,
+                    total_stock=summary.c.total_stock,
+                    option_count=summary.c.option_count,
+                    updated_at=Product.updated_at,  # cột tổng hợp, không tính là sửa sản phẩm
+                ),
+                execution_options={"synchronize_session": False},
+            )
+            await session.execute(
+                empty.values(min_price=None, total_stock=0, option_count=0, updated_at=Product.updated_at),
+                execution_options={"synchronize_session": False},
+            )
+            await session.commit()
@@ -1,6 +1,6 @@
 from sqlalchemy.future import select
 from app.model.refresh_token import RefreshToken
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 
@@ -9,7 +9,7 @@ class RefreshTokenRepository:
 
     async def create_token(self, token: RefreshToken):
         """ Thêm refresh token vào cơ sở dữ liệu """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(token)
             await session.commit()
             await session.refresh(token)
@@ -17,7 +17,7 @@ class RefreshTokenRepository:
 
     async def get_token(self, token_id: str):
         """ Lấy refresh token theo ID """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(RefreshToken).where(RefreshToken.id == token_id)
             )
@@ -25,7 +25,7 @@ class RefreshTokenRepository:
 
     async def delete_token(self, token_id: str):
         """ Xóa refresh token khỏi database """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             token = await session.get(RefreshToken, token_id)
             if token:
                 await session.delete(token)
@@ -33,7 +33,7 @@ class RefreshTokenRepository:
 
     async def delete_expired_tokens(self):
         """ Xóa tất cả các refresh token đã hết hạn """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 await session.execute(
                     f"DELETE FROM refresh_tokens WHERE expires_at < '{datetime.utcnow().isoformat()}'"
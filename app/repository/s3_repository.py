@@ -1,7 +1,7 @@
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 from app.model.s3_account import S3Account
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 from app.core.crypto import encrypt
 from app.core.exceptions import NotFoundError
 
@@ -18,7 +18,7 @@ class S3Repository:
         """
         Lấy tài khoản S3 của user đang hoạt động.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(S3Account)
                 .where(S3Account.user_id == user_id)
@@ -31,7 +31,7 @@ class S3Repository:
         Tạo mới hoặc cập nhật tài khoản S3.
         Nếu user đã có tài khoản, cập nhật key và endpoint.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 encrypted_access = encrypt(access_key)
                 encrypted_secret = encrypt(secret_key)
@@ -68,7 +68,7 @@ class S3Repository:
         """
         Vô hiệu hóa tài khoản S3 của user (is_active=False)
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 result = await session.execute(
                     select(S3Account).where(S3Account.user_id == user_id)
@@ -88,7 +88,7 @@ class S3Repository:
         """
         Kích hoạt tài khoản S3 của user (is_active=True)
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 result = await session.execute(
                     select(S3Account).where(S3Account.user_id == user_id)
@@ -4,7 +4,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.dialects.postgresql import insert
 from app.model.permission import Permission
 from app.model.user_permission import UserPermission
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 from app.core.exceptions import NotFoundError
 
 
@@ -14,7 +14,7 @@ class UserPermissionRepository:
         Lấy danh sách UserPermission theo user_id và permission_name,
         ưu tiên bản ghi có target_id = None (sắp xếp theo target_id ASC).
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(UserPermission)
                 .join(Permission, UserPermission.permission_id == Permission.id)
@@ -28,7 +28,7 @@ class UserPermissionRepository:
         """
         Lấy danh sách UserPermission theo user_id, sắp xếp theo id (tăng dần).
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(
                 select(UserPermission)
                 .where(UserPermission.user_id == user_id)
@@ -40,7 +40,7 @@ class UserPermissionRepository:
         """
         Thêm nhiều bản ghi UserPermission cùng lúc, bỏ qua các bản ghi trùng lặp dựa theo unique constraint.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 # Chuyển danh sách đối tượng thành danh sách dict
                 records = [
@@ -67,7 +67,7 @@ class UserPermissionRepository:
         Cập nhật nhiều bản ghi UserPermission cùng lúc.
         Sử dụng session.merge để đảm bảo đối tượng được cập nhật đúng trong session mới.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             # try:
             for up in user_permissions:
                 await session.merge(up)
@@ -82,7 +82,7 @@ class UserPermissionRepository:
         Nếu có bản ghi lỗi, nó sẽ không bị xóa nhưng các bản ghi hợp lệ khác vẫn được xóa.
         Trả về danh sách các bản ghi bị lỗi khi xóa.
         """
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             failed_deletes = []  # Danh sách các bản ghi không thể xóa
             try:
                 for up in user_permissions:
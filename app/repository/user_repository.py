@@ -1,14 +1,14 @@
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from app.model.user import User
-from app.core.database import AsyncSessionLocal
+from app.core.database import get_session
 from app.core.exceptions import DuplicateDataError
 
 class UserRepository:
 
     async def create_user(self, new_user: User):
         """Tạo mới người dùng với xử lý lỗi trùng dữ liệu"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 session.add(new_user)
                 await session.commit()
@@ -20,7 +20,7 @@ class UserRepository:
 
     async def update_user(self, user: User):
         """Cập nhật thông tin người dùng"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             session.add(user)
             await session.commit()
             await session.refresh(user)
@@ -28,7 +28,7 @@ class UserRepository:
 
     async def delete_user(self, user: User) -> bool:
         """Xóa người dùng và trả về True nếu thành công, False nếu thất bại"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             try:
                 await session.delete(user)
                 await session.commit()
@@ -40,7 +40,7 @@ class UserRepository:
     async def get_active_users_paginated(self, page: int, limit: int):
         """Lấy danh sách user đang hoạt động (is_active=True) với phân trang"""
         offset = (page - 1) * limit
-        async with AsyncSessionLocal() as session:
+        async with get_session(readonly=True) as session:
             result = await session.execute(
                 select(User)
                 .where(User.is_active == True)
@@ -50,20 +50,38 @@ class UserRepository:
             )
             return result.scalars().all()
 
+    async def get_active_users_after(self, after_id: int | None, limit: int):
+        """Phân trang keyset theo id: chỉ đọc các user có id > after_id"""
+        stmt = select(User).where(User.is_active == True)
+        if after_id is not None:
+            stmt = stmt.where(User.id > after_id)
+        async with get_session(readonly=True) as session:
+            result = await session.execute(stmt.order_by(User.id.asc()).limit(limit))
+            return result.scalars().all()
+
     async def get_user_by_id(self, user_id: int) -> User | None:
         """Tìm user theo ID"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(select(User).where(User.id == user_id))
             return result.scalar_one_or_none()
 
+    async def get_token_state(self, user_id: int) -> tuple[bool, int] | None:
+        """Chỉ lấy (is_active, token_version) của user, không tải cả bản ghi"""
+        async with get_session() as session:
+            result = await session.execute(
+                select(User.is_active, User.token_version).where(User.id == user_id)
+            )
+            row = result.one_or_none()
+            return tuple(row) if row else None
+
     async def get_user_by_username(self, username: str) -> User | None:
         """Tìm user theo username"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(select(User).where(User.username == username))
             return result.scalar_one_or_none()
 
     async def get_user_by_email(self, email: str) -> User | None:
         """Tìm user theo email"""
-        async with AsyncSessionLocal() as session:
+        async with get_session() as session:
             result = await session.execute(select(User).where(User.email == email))
             return result.scalar_one_or_none()
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, StringConstraints
 from typing_extensions import Annotated
 from datetime import datetime
+from decimal import Decimal
 
 class ProductBase(BaseModel):
     name: Annotated[
@@ -60,3 +61,23 @@ class ProductRead(ProductBase):
             }
         }
     }
+
+class ProductDto(BaseModel):
+    """Sản phẩm kèm thuộc tính, giá thấp nhất và tổng tồn kho (dựng bởi ProductService.to_dtos)"""
+    id: int
+    name: str
+    location_address: str
+    category_id: int | None = None
+    description: str | None = None
+    price: Decimal | None = None
+    stock: int = 0
+    attribute: dict[str, list[str]] = {}
+    discount_percentage: int | None = None
+
+class ProductOptionDto(BaseModel):
+    id: int
+    product_id: int
+    price: Decimal | None = None
+    stock: int
+
+    model_config = {"from_attributes": True}
@@ -124,3 +124,15 @@ class UserUpdate(UserBase):
             }
         }
     }
+
+
+class UserActiveUpdate(BaseModel):
+    is_active: bool
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "is_active": False
+            }
+        }
+    }
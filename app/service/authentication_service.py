@@ -1,11 +1,14 @@
 import os
+import time
 from fastapi import HTTPException
 from datetime import datetime, timedelta #, timezone
 from jose import jwt, JWTError
-from app.model.user import User
+from app.core.principal import Principal
 from .user_service import UserService
 from .blacklist_token_service import BlacklistTokenService
 from .refresh_token_service import RefreshTokenService
+from app.core import invalidation
+from app.core.cache import verified_token_cache
 from app.core.config import SECRET_KEY, ALGORITHM, JWT_ISSUER, JWT_AUDIENCE, ACCESS_TOKEN_EXPIRE, REFRESH_TOKEN_EXPIRE
 from app.schema.auth_schema import LoginRequest
 
@@ -47,6 +50,7 @@ class AuthenticationService:
             "username": user.username,
             "email": user.email,
             "isActive": user.is_active,
+            "ver": user.token_version or 0,
             "type": token_type,
         }
         if token_type == "access":
@@ -85,19 +89,39 @@ class AuthenticationService:
 
         return payload
 
-    async def get_current_user(self, token: str) -> User:
+    async def get_current_user(self, token: str) -> tuple[Principal, dict]:
+        """
+        Xác thực token và trả về (principal, payload).
+        Principal được dựng từ claims, không tải bản ghi User.
+        Payload đã xác thực được cache theo token (tối đa đến exp của token) để các request sau
+        bỏ qua việc decode JWT, kiểm tra blacklist và kiểm tra token_version.
+        """
+        payload = verified_token_cache.get(token)
+        if payload is not None:
+            return Principal.from_payload(payload), payload
+
         payload = await self.validate_token(token)
         if "jti" in payload:
             if await self.blacklist_token_service.is_token_blacklisted(payload["jti"]):
                 raise HTTPException(status_code=401, detail="You have logged out.")
         else:
             raise HTTPException(status_code=401, detail="Invalid token")
-        if "uid" in payload:
-            user_id = payload["uid"]
-            return (await self.user_service.get_user_by_id(user_id), payload)
-        else:
+        if "uid" not in payload:
             raise HTTPException(status_code=401, detail="Invalid token")
 
+        user_id = payload["uid"]
+        version = await self.user_service.get_token_version(user_id)
+        if version is None or payload.get("ver", 0) != version:
+            raise HTTPException(status_code=401, detail="Token has been revoked.")
+
+        verified_token_cache.set(
+            token,
+            payload,
+            ttl=payload["exp"] - time.time(),
+            tags=(f"jti:{payload['jti']}", f"uid:{user_id}"),
+        )
+        return Principal.from_payload(payload), payload
+
     async def refresh_access_token(self, refresh_token_string: str) -> str:
         """
         Cấp lại Access Token từ Refresh Token.
@@ -145,6 +169,7 @@ class AuthenticationService:
             raise HTTPException(status_code=400, detail="Refresh Token ID is missing in the Access Token.")
         expires_at = datetime.utcfromtimestamp(exp_timestamp)
         await self.blacklist_token_service.add_token(jti, expires_at)
+        await invalidation.publish("token_jti", jti)
         await self.refresh_token_service.delete_token(refresh_id)
 
     async def extract_token_id(self, token_string: str) -> str | None:
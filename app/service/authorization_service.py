@@ -1,5 +1,8 @@
-from typing import Optional, List
-from app.model.user import User
+from typing import Optional, List, Iterable
+from sqlalchemy import true, false, ColumnElement
+from app.core.principal import Principal
+from app.repository.authorization_repository import AuthorizationRepository
+from app.core.permission_cache import PermissionSnapshot, permission_cache, current_generation
 from .user_permission_service import UserPermissionService
 from .group_member_service import GroupMemberService
 from .group_permission_service import GroupPermissionService
@@ -7,6 +10,7 @@ from .permission_service import PermissionService
 
 class AuthorizationService:
     def __init__(self):
+        self.repository = AuthorizationRepository()
         self.user_permission_service = UserPermissionService()
         self.group_member_service = GroupMemberService()
         self.group_permission_service = GroupPermissionService()
@@ -14,7 +18,7 @@ class AuthorizationService:
 
     async def check_permission(
         self,
-        user: User,
+        user: Principal,
         permission_name: str,
         target_id: Optional[int] = None,
         is_user_owned: bool = False
@@ -28,27 +32,71 @@ class AuthorizationService:
         :param is_user_owned: Tài nguyên truy cập, chỉnh sửa thuộc về người đang đăng nhập, và user_permission_service không có phản hồi rõ ràng rằng người dùng có quyền hay không.
         :return: True nếu người dùng hoặc nhóm có quyền, False nếu không
         """
-        # 1. Kiểm tra quyền của người dùng
-        user_permission = await self.user_permission_service.has_permission(user.id, permission_name, target_id)
-        if user_permission < 0:
-            return False
-        elif user_permission > 0:
-            return True
+        # Tra cứu trong registry trong bộ nhớ; quyền không tồn tại thì coi như không được cấp
+        permission = await self.permission_service.find_permission_entry(permission_name)
+        if permission is None:
+            return is_user_owned
+
+        if permission_cache.maxsize > 0:
+            snapshot = await self.get_permission_snapshot(user.id)
+            return snapshot.is_granted(permission.id, permission.default, target_id, is_user_owned)
+
+        # Không dùng cache: giải quyết bằng một truy vấn duy nhất
+        resolved = await self.repository.resolve_permission(user.id, permission_name, target_id)
+        _, user_decision, group_granted = resolved or (None, None, False)
+
+        # 1. Quyền của người dùng được ưu tiên (deny/allow rõ ràng)
+        if user_decision is not None:
+            return user_decision > 0
 
         if is_user_owned:
             return True
 
-        # 2. Lấy danh sách các nhóm mà người dùng thuộc về
-        groups = await self.group_member_service.find_groups_by_user(user)
+        # 2. Quyền được cấp bởi ít nhất một nhóm mà người dùng thuộc về
+        if group_granted:
+            return True
 
-        # 3. Kiểm tra quyền của từng nhóm
-        for group in groups:
-            if await self.group_permission_service.has_permission(group.id, permission_name, target_id)>0:
-                return True
+        # 3. Nếu không tìm thấy quyền hợp lệ, dùng quyền mặc định của permission
+        return permission.default
 
-        # 4. Nếu không tìm thấy quyền hợp lệ, kiểm tra mặc định từ permission
-        permission = await self.permission_service.get_permission_by_name(permission_name)
-        if permission:
-            return permission.default
-        else:
-            return False
+    async def check_many(self, user: Principal, permission_name: str, target_ids: Iterable[int]) -> list[int]:
+        """
+        Kiểm tra một quyền trên nhiều target cùng lúc, trả về các target được phép (giữ nguyên thứ tự).
+        Số truy vấn không phụ thuộc số target: tối đa 2 truy vấn khi snapshot chưa có trong cache.
+        """
+        permission = await self.permission_service.find_permission_entry(permission_name)
+        if permission is None:
+            return []
+        snapshot = await self.get_permission_snapshot(user.id)
+        return [t for t in target_ids if snapshot.is_granted(permission.id, permission.default, t)]
+
+    async def target_filter(self, user: Principal, permission_name: str, column) -> ColumnElement[bool]:
+        """
+        Chuyển quyền của user thành điều kiện SQL trên cột target (vd: Product.id),
+        để repository lọc "chỉ những dòng được phép" ngay trong truy vấn:
+            stmt = select(Product).where(await authorization.target_filter(user, "edit_product", Product.id))
+        """
+        permission = await self.permission_service.find_permission_entry(permission_name)
+        if permission is None:
+            return false()
+        snapshot = await self.get_permission_snapshot(user.id)
+        everywhere, exceptions = snapshot.target_scope(permission.id, permission.default)
+        if everywhere:
+            return column.not_in(exceptions) if exceptions else true()
+        return column.in_(exceptions) if exceptions else false()
+
+    async def get_permission_snapshot(self, user_id: int) -> PermissionSnapshot:
+        """
+        Lấy bảng quyền hiệu lực của user từ cache, nếu chưa có thì dựng từ
+        user_permissions, group_permissions và tập nhóm đã cache của user.
+        """
+        snapshot = permission_cache.get(user_id)
+        if snapshot is None:
+            generation = current_generation()
+            group_ids = await self.group_member_service.get_group_ids_by_user(user_id)
+            user_rows, group_rows = await self.repository.load_effective_permissions(user_id, group_ids)
+            snapshot = PermissionSnapshot.build(user_id, user_rows, group_ids, group_rows)
+            # Có thay đổi quyền trong lúc đang tải thì không cache snapshot có thể đã cũ
+            if generation == current_generation():
+                permission_cache.set(user_id, snapshot, tags=[f"group:{gid}" for gid in group_ids])
+        return snapshot
@@ -2,15 +2,14 @@ from fastapi import HTTPException, status
 from app.repository.category_repository import CategoryRepository
 from app.schema.category_schema import CategoryCreate, CategoryUpdate
 from app.model.category import Category
-from app.service.product_service import ProductService
 from app.core.exceptions import DuplicateDataError
+from app.core.category_tree import category_tree, invalidate_category_tree
 
 
 class CategoryService:
 
     def __init__(self):
         self.repository = CategoryRepository()
-        self.product_service = ProductService()
 
     async def get_all_categories(self):
         """Lấy tất cả danh mục"""
@@ -27,6 +26,24 @@ class CategoryService:
         """Lấy danh mục con theo parent_id"""
         return await self.repository.find_by_parent_id(parent_id)
 
+    async def get_category_tree(self):
+        """Cây danh mục hiện tại (snapshot trong bộ nhớ)"""
+        return await category_tree.get()
+
+    async def get_descendant_ids(self, category_id: int, include_self: bool = False) -> list[int]:
+        """Id của toàn bộ danh mục con cháu"""
+        tree = await category_tree.get()
+        if category_id not in tree:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+        return tree.descendant_ids(category_id, include_self)
+
+    async def get_ancestor_path(self, category_id: int) -> list[dict]:
+        """Đường dẫn từ danh mục gốc tới danh mục (breadcrumb)"""
+        tree = await category_tree.get()
+        if category_id not in tree:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+        return tree.ancestor_path(category_id)
+
     async def create_category(self, category_data: CategoryCreate):
         """Tạo danh mục mới"""
         # Nếu có parent_id, kiểm tra xem danh mục cha có tồn tại không
@@ -40,9 +57,12 @@ class CategoryService:
         # Khởi tạo đối tượng Category từ dữ liệu đầu vào
         new_category = Category(**category_data.model_dump())
         try:
-            return await self.repository.create_category(new_category)
+            category = await self.repository.create_category(new_category)
         except DuplicateDataError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        await self.repository.add_to_closure(category.id, category.parent_id)
+        await invalidate_category_tree()
+        return category
 
     async def update_category(self, category_id: int, category_data: CategoryUpdate):
         """Cập nhật danh mục"""
@@ -59,28 +79,29 @@ class CategoryService:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST, detail="Parent category not found"
                     )
+                # Không cho chuyển danh mục vào chính nó hoặc cây con của nó (tạo vòng lặp).
+                # Kiểm tra trên category_closure trong transaction của request, không dùng snapshot cây có thể đã cũ
+                if parent.id == category.id or await self.repository.is_descendant(parent.id, category.id):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST, detail="Parent category cannot be a descendant"
+                    )
 
+        old_parent_id = category.parent_id
         for key, value in update_data.items():
             setattr(category, key, value)
-        return await self.repository.update_category(category)
+        category = await self.repository.update_category(category)
+        if category.parent_id != old_parent_id:
+            await self.repository.move_in_closure(category.id, category.parent_id)
+        await invalidate_category_tree()
+        return category
 
     async def delete_category(self, category_id: int):
         """Xóa danh mục"""
         category = await self.get_category_by_id(category_id)
 
-        # Cập nhật các danh mục con: chuyển parent_id của con thành parent_id của danh mục bị xóa
-        children = await self.get_subcategories_by_parent_id(category_id)
-        for child in children:
-            child.parent_id = category.parent_id
-            await self.repository.update_category(child)
-
-        # Cập nhật sản phẩm thuộc danh mục: chuyển category_id của sản phẩm thành parent_id của danh mục bị xóa
-        products = await self.product_service.find_products_by_category_id(category_id)
-        for product in products:
-            product.category_id = category.parent_id
-            await self.product_service.update_product(product)
-
-        success = await self.repository.delete_category(category)
-        if not success:
+        # Danh mục con và sản phẩm chuyển sang danh mục cha của danh mục bị xóa (UPDATE hàng loạt)
+        counts = await self.repository.delete_and_reparent(category.id, category.parent_id)
+        if not counts["deleted"]:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to delete category")
-        return {"message": "Category deleted"}
+        await invalidate_category_tree()
+        return {"message": "Category deleted", **counts}
@@ -4,6 +4,7 @@ from app.model.user import User
 from app.model.group import Group
 from app.model.group_member import GroupMember
 from app.core.exceptions import DuplicateDataError
+from app.core.permission_cache import group_membership_cache, current_generation, invalidate_user_groups
 from app.schema.group_member_schema import GroupMemberBase, GroupMemberCreate
 from .user_service import UserService
 from .group_service import GroupService
@@ -27,9 +28,10 @@ class GroupMemberService:
         group_member = GroupMember(user_id=user.id, group_id=group.id)
         try:
             group_member = await self.group_member_repository.add(group_member)
-            return group_member
         except DuplicateDataError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        await invalidate_user_groups(user.id)
+        return group_member
 
     async def remove_user_from_group(self, data: GroupMemberBase) -> None:
         """
@@ -44,6 +46,7 @@ class GroupMemberService:
         success = await self.group_member_repository.delete(group_member)
         if not success:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to remove user from group")
+        await invalidate_user_groups(user.id)
 
     async def find_groups_by_user(self, user: User) -> list[Group]:
         """
@@ -54,6 +57,18 @@ class GroupMemberService:
         groups = [gm.group for gm in group_members]
         return groups
 
+    async def get_group_ids_by_user(self, user_id: int) -> frozenset[int]:
+        """
+        Tập group_id mà User thuộc về, lấy từ cache (xóa khi thêm/xóa thành viên hoặc xóa nhóm).
+        """
+        group_ids = group_membership_cache.get(user_id)
+        if group_ids is None:
+            generation = current_generation()
+            group_ids = frozenset(await self.group_member_repository.find_group_ids_by_user(user_id))
+            if generation == current_generation():
+                group_membership_cache.set(user_id, group_ids, tags=[f"group:{gid}" for gid in group_ids])
+        return group_ids
+
     async def get_groups_by_user(self, user_id: int) -> list:
         """
         Tìm danh sách Group mà User thuộc về dựa theo user ID.
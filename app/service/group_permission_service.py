@@ -3,6 +3,7 @@ from app.repository.group_permission_repository import GroupPermissionRepository
 from app.model.group_permission import GroupPermission
 from app.model.group import Group
 from app.model.permission import Permission
+from app.core.permission_cache import invalidate_group_permissions
 from .group_service import GroupService
 from .permission_service import PermissionService
 from app.schema.group_permission_schema import (
@@ -48,6 +49,7 @@ class GroupPermissionService:
             })
 
         await self.repository.bulk_insert(group_permissions_to_add)
+        await invalidate_group_permissions(group.id)
         return assigned_permissions
 
     async def set_permission(self, group: Group, permissions: list[Permission]) -> list:
@@ -71,6 +73,7 @@ class GroupPermissionService:
             group_permissions.append(group_permission)
 
         await self.repository.bulk_insert(group_permissions_to_add)
+        await invalidate_group_permissions(group.id)
         return group_permissions
 
     async def find_permissions_by_group(self, group: Group) -> list[GroupPermission]:
@@ -124,6 +127,7 @@ class GroupPermissionService:
             updated_permissions.append(group_permission)
 
         await self.repository.bulk_update(updated_permissions)
+        await invalidate_group_permissions(group.id)
         return [{"permission_id": gp.permission_id, "status": "updated"} for gp in updated_permissions]
 
     async def delete_permissions(self, data: GroupPermissionsDelete) -> None:
@@ -146,6 +150,7 @@ class GroupPermissionService:
         group_permissions_to_delete = [gp for gp in group_permissions if gp.permission_id in requested_permission_ids]
 
         failed_deletes = await self.repository.bulk_delete(group_permissions_to_delete)
+        await invalidate_group_permissions(group.id)
         if failed_deletes:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
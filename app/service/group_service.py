@@ -3,6 +3,7 @@ from app.repository.group_repository import GroupRepository
 from app.schema.group_schema import GroupCreate, GroupUpdate
 from app.model.group import Group
 from app.core.exceptions import DuplicateDataError
+from app.core.permission_cache import invalidate_group_members
 
 class GroupService:
     def __init__(self):
@@ -41,4 +42,5 @@ class GroupService:
         success = await self.repository.delete_group(group)
         if not success:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to delete group")
+        await invalidate_group_members(group.id)
         return {"message": "Group deleted"}
@@ -1,6 +1,9 @@
 from fastapi import HTTPException
 from app.repository.permission_repository import PermissionRepository
 from app.model.permission import Permission
+from app.core import invalidation
+from app.core.permission_cache import invalidate_all_permissions
+from app.core.permission_registry import permission_registry, PermissionEntry
 
 class PermissionService:
     def __init__(self):
@@ -119,6 +122,9 @@ class PermissionService:
             if perm.name not in static_permissions:
                 await self.permission_repository.delete(perm)
 
+        await self.refresh_registry()
+        await invalidate_all_permissions()
+
     async def get_all_permissions(self) -> list[Permission]:
         """Trả về danh sách tất cả các quyền (Permission)."""
         return await self.permission_repository.find_all()
@@ -145,20 +151,30 @@ class PermissionService:
             raise HTTPException(404, "Permission "+name+" not found.")
         return permission
 
+    async def find_permission_entry(self, name: str) -> PermissionEntry | None:
+        """Tra cứu (id, name, default) của quyền trong registry trong bộ nhớ, không truy vấn DB."""
+        return await permission_registry.get(name)
+
+    async def refresh_registry(self) -> None:
+        """Dựng lại registry ở worker hiện tại và báo cho các worker khác."""
+        await invalidation.publish("permissions")
+        await permission_registry.refresh()
 
     async def create_permission(self, name: str, description: str = None) -> Permission:
         """
         Tạo mới một quyền.
         Nếu quyền đã tồn tại (theo tên) sẽ ném ngoại lệ.
         """
-        existing = await self.get_permission_by_name(name)
+        existing = await permission_registry.get(name)
         if existing:
             raise HTTPException(403, f"Permission with name '{name}' already exists.")
 
         permission = Permission()
         permission.name = name
         permission.description = description
-        return await self.permission_repository.add(permission)
+        permission = await self.permission_repository.add(permission)
+        await self.refresh_registry()
+        return permission
 
     async def update_permission(self, id: int, data: dict) -> Permission:
         """
@@ -171,13 +187,15 @@ class PermissionService:
 
         if "name" in data:
             # Kiểm tra xem nếu đổi tên thì không trùng với quyền khác
-            existing = await self.get_permission_by_name(data["name"])
+            existing = await permission_registry.get(data["name"])
             if existing and existing.id != id:
                 raise HTTPException(403, f"Permission with name '{data['name']}' already exists.")
             permission.name = data["name"]
         if "description" in data:
             permission.description = data["description"]
-        return await self.permission_repository.update(permission)
+        permission = await self.permission_repository.update(permission)
+        await self.refresh_registry()
+        return permission
 
     async def delete_permission(self, id: int) -> None:
         """Xóa quyền theo ID."""
@@ -185,3 +203,5 @@ class PermissionService:
         if not permission:
             raise HTTPException(403, "Permission not found.")
         await self.permission_repository.delete(permission)
+        await self.refresh_registry()
+        await invalidate_all_permissions()
@@ -1,9 +1,14 @@
 import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from fastapi import HTTPException, status
+from app.core import invalidation
+from app.core.category_tree import invalidate_category_tree
+from app.core.utils import encode_cursor, decode_cursor
 from app.repository.product_repository import ProductRepository
 from app.repository.category_repository import CategoryRepository
 from app.model.product import Product
-from app.model.product_option import ProductOption
+from app.model.product_option import ProductOption, variant_signature
 from .product_attribute_service import ProductAttributeService
 from .product_attribute_value_service import ProductAttributeValueService
 from .product_option_service import ProductOptionService
@@ -23,45 +28,93 @@ class ProductService:
 
     async def to_dto(self, product: Product) -> dict:
         """Chuyển đối tượng Product thành dict (DTO)"""
-        attributes = await self.get_product_attributes(product)
-        price_and_stock = await self.get_product_price_and_stock(product)
-        return {
-            "id": product.id,
-            "name": product.name,
-            "location_address": product.location_address,
-            "category_id": product.category.id if product.category else None,
-            "description": product.description,
-            "price": price_and_stock["prices"],
-            "stock": price_and_stock["stock"],
-            "attribute": attributes,
-            "discount_percentage": product.discount_percentage,
-        }
-
-    async def search_products_by_keywords(self, keywords: str) -> list:
-        """Tìm sản phẩm theo từ khóa và trả về DTO của sản phẩm chưa bị xóa"""
-        products = await self.product_repository.search_products_by_keywords(keywords)
-        result = []
-        for product in products:
-            if not product.is_delete:
-                result.append(await self.to_dto(product))
-        return result
+        return (await self.to_dtos([product]))[0]
+
+    async def to_dtos(self, products: list[Product]) -> list[dict]:
+        """
+        Chuyển một danh sách Product thành DTO: giá và tồn kho đọc từ cột tổng hợp của products,
+        thuộc tính của cả danh sách tải trong một truy vấn rồi ghép trong bộ nhớ.
+        """
+        attribute_rows = await self.product_repository.load_attribute_rows([p.id for p in products])
+
+        # product_id -> {attribute_id: (name, [values])}, giữ thứ tự theo id
+        attributes: dict[int, dict] = {}
+        for product_id, attribute_id, name, value in attribute_rows:
+            _, values = attributes.setdefault(product_id, {}).setdefault(attribute_id, (name, []))
+            if value is not None:
+                values.append(value)
+
+        return [
+            {
+                "id": product.id,
+                "name": product.name,
+                "location_address": product.location_address,
+                "category_id": product.category_id,
+                "description": product.description,
+                "price": product.min_price,
+                "stock": product.total_stock or 0,
+                "attribute": {name: values for name, values in attributes.get(product.id, {}).values()},
+                "discount_percentage": product.discount_percentage,
+            }
+            for product in products
+        ]
+
+    async def search_products_by_keywords(self, keywords: str, limit: int, cursor: str | None = None) -> tuple[list, str | None]:
+        """
+        Tìm sản phẩm chưa bị xóa theo từ khóa (sắp theo độ liên quan), trả về
+        (DTO, cursor trang sau hoặc None).
+        """
+        after = None
+        if cursor:
+            try:
+                keys = decode_cursor(cursor, "rank")
+                after = (float(keys[0]), int(keys[1]))
+            except (ValueError, TypeError, IndexError):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+        rows = await self.product_repository.search_products_by_keywords(keywords, limit + 1, after)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            product, rank = rows[-1]
+            next_cursor = encode_cursor("rank", [rank, product.id])
+        return await self.to_dtos([product for product, _ in rows]), next_cursor
 
     async def get_all_product_dtos(self) -> list:
         """Lấy tất cả sản phẩm (DTO) chưa bị xóa"""
         products = await self.product_repository.find_all()
-        result = []
-        for product in products:
-            if not product.is_delete:
-                result.append(await self.to_dto(product))
-        return result
+        return await self.to_dtos([product for product in products if not product.is_delete])
 
-    async def get_paginated_product_dtos(self, page: int, limit: int) -> list:
+    async def get_paginated_product_dtos(self, page: int, limit: int, sort: str = "id", min_price=None, max_price=None) -> list:
         """Lấy sản phẩm theo phân trang và trả về DTO"""
-        products = await self.product_repository.find_all_paginated(page, limit)
-        result = []
-        for product in products:
-            result.append(await self.to_dto(product))
-        return result
+        products = await self.product_repository.find_all_paginated(page, limit, sort == "newest", min_price, max_price)
+        return await self.to_dtos(products)
+
+    async def get_product_dto_page(
+        self, limit: int, cursor: str | None = None, sort: str = "id", min_price=None, max_price=None,
+        category_id: int | None = None,
+    ) -> tuple[list, str | None]:
+        """
+        Lấy một trang sản phẩm theo cursor (keyset), trả về (DTO, cursor trang sau hoặc None).
+        sort: "id" (tăng dần) hoặc "newest" (created_at, id giảm dần).
+        category_id: chỉ lấy sản phẩm của danh mục và các danh mục con cháu.
+        """
+        newest = sort == "newest"
+        after = None
+        if cursor:
+            try:
+                keys = decode_cursor(cursor, sort)
+                after = (datetime.fromisoformat(keys[0]), int(keys[1])) if newest else (int(keys[0]),)
+            except (ValueError, TypeError, IndexError):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+        products = await self.product_repository.find_page_after(limit + 1, after, newest, min_price, max_price, category_id)
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            next_cursor = encode_cursor(sort, [last.created_at, last.id] if newest else [last.id])
+        return await self.to_dtos(products), next_cursor
 
     async def get_product_dto_by_id(self, product_id: int) -> dict:
         """Lấy DTO của sản phẩm theo ID"""
@@ -75,15 +128,6 @@ class ProductService:
         #     raise AppException("Product not found")
         return product
 
-    async def get_product_attributes(self, product: Product) -> dict:
-        """Lấy thuộc tính và giá trị của sản phẩm"""
-        attributes = await self.product_attribute_service.find_by_product(product)
-        result = {}
-        for attr in attributes:
-            values = await self.product_attribute_value_service.find_by_attribute(attr)
-            result[attr.name] = [val.value for val in values]
-        return result
-
     async def create_product(self, data: dict) -> dict:
         """Tạo sản phẩm mới"""
         # if "name" not in data:
@@ -106,6 +150,7 @@ class ProductService:
 
         # Tạo sản phẩm trong DB thông qua repository
         product = await self.product_repository.create(product)
+        await self.adjust_category_counts(None, product.category_id)
 
         # Xử lý attributes nếu có
         if "attribute" in data and isinstance(data["attribute"], dict):
@@ -117,6 +162,8 @@ class ProductService:
         price = data.get("price", None)
         stock = data.get("stock", 0)
         await self.product_option_service.create_product_option(product, price, stock)
+        product = await self.refresh_option_summary(product)
+        await invalidation.publish("product_names", product.id)
 
         return await self.to_dto(product)
 
@@ -124,6 +171,7 @@ class ProductService:
         """Cập nhật thông tin sản phẩm"""
         product = await self.get_product_by_id(product_id)
         option_default = await self.find_option_default(product)
+        old_category_id = product.category_id
         
         if "name" in data and data["name"]:
             product.name = data["name"]
@@ -147,6 +195,9 @@ class ProductService:
 
         # Cập nhật thông tin sản phẩm trong DB thông qua repository
         product = await self.product_repository.update(product)
+        await invalidation.publish("product_names", product.id)
+        if not product.is_delete and product.category_id != old_category_id:
+            await self.adjust_category_counts(old_category_id, product.category_id)
 
         # Xử lý attributes nếu có
         if "attribute" in data and isinstance(data["attribute"], dict):
@@ -166,31 +217,20 @@ class ProductService:
                     if not existing_value:
                         await self.product_attribute_value_service.create_product_attribute_value(product_attribute, value)
 
+        if option_default and ("price" in data or "stock" in data):
+            product = await self.refresh_option_summary(product)
+
         return await self.to_dto(product)
 
     async def delete_product(self, product_id: int) -> None:
         """Đánh dấu sản phẩm là đã xóa (soft-delete)"""
         product = await self.get_product_by_id(product_id)
+        was_deleted = product.is_delete
         product.is_delete = True
         await self.product_repository.update(product)
-
-    async def get_product_price_and_stock(self, product: Product) -> dict:
-        """Tính toán giá thấp nhất và tổng số tồn kho từ các tùy chọn sản phẩm"""
-        options = await self.product_option_service.find_by_product(product)
-        if len(options) == 1:
-            return {"prices": options[0].price, "stock": options[0].stock}
-        
-        # Lọc các option có option values hợp lệ
-        valid_options = []
-        for option in options:
-            option_values = await self.product_option_value_service.find_by_option(option)
-            if option_values:
-                valid_options.append(option)
-        if valid_options:
-            prices = [opt.price for opt in valid_options]
-            total_stock = sum(opt.stock for opt in valid_options)
-            return {"prices": min(prices), "stock": total_stock}
-        return {"prices": None, "stock": 0}
+        await invalidation.publish("product_names", product.id)
+        if not was_deleted:
+            await self.adjust_category_counts(product.category_id, None)
 
     async def find_option_default(self, product: Product) -> ProductOption:
         """Tìm tùy chọn mặc định của sản phẩm"""
@@ -204,37 +244,30 @@ class ProductService:
         return None
 
     async def find_option_by_attribute_values(self, product: Product, attribute_values: list) -> ProductOption:
-        """Tìm tùy chọn dựa trên danh sách các giá trị thuộc tính cho trước"""
-        options = await self.product_option_service.find_by_product(product)
-        for option in options:
-            option_values = await self.product_option_value_service.find_by_option(option)
-            option_value_ids = [val.product_attribute_value.id for val in option_values]
-            attribute_value_ids = [val.id for val in attribute_values]
-            if set(option_value_ids) == set(attribute_value_ids):
-                return option
-        return None
-
-    async def update_or_create_product_attributes_and_options(self, product_id: int, json_data: dict) -> None:
-        """Cập nhật hoặc tạo mới các thuộc tính và tùy chọn cho sản phẩm"""
+        """Tìm tùy chọn dựa trên danh sách các giá trị thuộc tính cho trước (1 truy vấn theo variant_signature)"""
+        # Không có giá trị thuộc tính nào: khớp option mặc định (variant_signature NULL)
+        signature = variant_signature(val.id for val in attribute_values) if attribute_values else None
+        return await self.product_repository.find_option_by_signature(product.id, signature)
+
+    async def update_or_create_product_attributes_and_options(self, product_id: int, json_data: dict) -> dict:
+        """
+        Cập nhật hoặc tạo mới các thuộc tính và tùy chọn cho sản phẩm.
+        Cả ma trận được kiểm tra trước, rồi ghi hàng loạt trong một transaction;
+        trả về số tùy chọn inserted / updated / unchanged.
+        """
         product = await self.get_product_by_id(product_id)
-        # if not product:
-        #     raise AppException("Product not found")
 
         attributes = json_data.get("attribute", [])
         values = json_data.get("value", [])
 
         if not attributes or not values:
             raise ValueError("Invalid input data: 'attribute' and 'value' are required.")
+        attributes = [str(name) for name in attributes]
+        if len(set(attributes)) != len(attributes):
+            raise ValueError("Invalid input data: duplicate attribute names.")
 
-        # Bước 1: Đảm bảo các ProductAttribute tồn tại
-        attribute_entities = []
-        for attr_name in attributes:
-            attribute = await self.product_attribute_service.find_by_name_and_product(attr_name, product)
-            if not attribute:
-                attribute = await self.product_attribute_service.create_product_attribute(product, attr_name)
-            attribute_entities.append(attribute)
-
-        # Bước 2: Xử lý các giá trị thuộc tính và tùy chọn
+        # {tuple giá trị: (price, stock)}; tổ hợp lặp lại thì dòng sau thắng
+        variants: dict[tuple, tuple] = {}
         for value_set in values:
             attribute_values = value_set[0] if len(value_set) > 0 else []
             option_data = value_set[1] if len(value_set) > 1 else []
@@ -243,30 +276,35 @@ class ProductService:
 
             if len(attribute_values) != len(attributes) or price is None or stock is None:
                 raise ValueError("Invalid value set: Mismatch between attributes and values or missing price/stock.")
-
-            attribute_value_entities = []
-            for index, value in enumerate(attribute_values):
-                attribute = attribute_entities[index]
-                attribute_value = await self.product_attribute_value_service.find_by_value_and_attribute(value, attribute)
-                if not attribute_value:
-                    attribute_value = await self.product_attribute_value_service.create_product_attribute_value(attribute, value)
-                else:
-                    await self.product_attribute_value_service.update_product_attribute_value(attribute_value, value)
-                attribute_value_entities.append(attribute_value)
-
-            # Bước 3: Tìm hoặc tạo ProductOption
-            existing_option = await self.find_option_by_attribute_values(product, attribute_value_entities)
-            if not existing_option:
-                product_option = await self.product_option_service.create_product_option(product, price, stock)
-            else:
-                await self.product_option_service.update_product_option(existing_option, price, stock)
-                product_option = existing_option
-
-            # Bước 4: Liên kết ProductOption với các giá trị thuộc tính
-            for attribute_value_entity in attribute_value_entities:
-                existing_option_value = await self.product_option_value_service.find_by_value_and_option(attribute_value_entity, product_option)
-                if not existing_option_value:
-                    await self.product_option_value_service.create_product_option_value(product_option, attribute_value_entity)
+            try:
+                price = Decimal(str(price)).quantize(Decimal("0.01"))
+                stock = int(stock)
+            except (InvalidOperation, TypeError, ValueError):
+                raise ValueError("Invalid value set: price/stock must be numbers.")
+            variants[tuple(str(value) for value in attribute_values)] = (price, stock)
+
+        counts = await self.product_repository.upsert_variant_matrix(product.id, attributes, variants)
+        await self.refresh_option_summary(product)
+        return counts
+
+    async def adjust_category_counts(self, old_category_id: int | None, new_category_id: int | None) -> None:
+        """
+        Một sản phẩm chưa xóa rời danh mục cũ / vào danh mục mới (None: không có):
+        cập nhật category_stats cùng transaction, cây danh mục sẽ nạp lại số mới.
+        """
+        if old_category_id == new_category_id:
+            return
+        await self.category_repository.adjust_product_count(old_category_id, -1)
+        await self.category_repository.adjust_product_count(new_category_id, 1)
+        await invalidate_category_tree()
+
+    async def refresh_option_summary(self, product: Product) -> Product:
+        """
+        Cập nhật min_price, total_stock, option_count của sản phẩm sau khi ghi option/tồn kho
+        (cùng transaction với thao tác ghi), trả về product đã nạp lại.
+        """
+        await self.product_repository.refresh_option_summary([product.id])
+        return await self.product_repository.reload(product)
 
     async def find_product_option_by_json(self, product: Product, json_string: str) -> ProductOption:
         """Tìm tùy chọn sản phẩm dựa trên chuỗi JSON mô tả các thuộc tính"""
@@ -275,17 +313,22 @@ class ProductService:
         except json.JSONDecodeError:
             raise ValueError("Invalid JSON string")
 
-        attribute_value_entities = []
+        # Tải id giá trị thuộc tính của mọi thuộc tính được hỏi trong 1 truy vấn
+        rows = await self.product_repository.find_attribute_value_ids(product.id, attribute_data.keys())
+        known_attributes = {name for name, _, _ in rows}
+        value_ids = {(name, value): id for name, value, id in rows}
+
+        attribute_value_ids = []
         for attribute_name, attribute_value in attribute_data.items():
-            product_attribute = await self.product_attribute_service.find_by_name_and_product(attribute_name, product)
-            if not product_attribute:
+            if attribute_name not in known_attributes:
                 raise Exception(f"Attribute '{attribute_name}' not found for this product.")
-            product_attribute_value = await self.product_attribute_value_service.find_by_value_and_attribute(attribute_value, product_attribute)
-            if not product_attribute_value:
+            value_id = value_ids.get((attribute_name, str(attribute_value)))
+            if value_id is None:
                 raise Exception(f"Attribute value '{attribute_value}' not found for attribute '{attribute_name}'.")
-            attribute_value_entities.append(product_attribute_value)
+            attribute_value_ids.append(value_id)
 
-        product_option = await self.find_option_by_attribute_values(product, attribute_value_entities)
+        signature = variant_signature(attribute_value_ids) if attribute_value_ids else None
+        product_option = await self.product_repository.find_option_by_signature(product.id, signature)
         if not product_option:
             raise Exception("No matching product option found for the provided attributes.")
         return product_option
@@ -106,13 +106,41 @@ class S3AdminService:
             timeout=timeout,
         )
 
-    async def get_user(self, uid: str) -> Dict[str, Any]:
+    def get_user(self, uid: str) -> Dict[str, Any]:
         r = self.client.get("/user", {"uid": uid, "stats": "false"})
         if r.status_code != 200:
             raise RuntimeError(f"Cannot fetch user info: {r.status_code} {r.text}")
-        return await r.json()
+        return r.json()
 
-    async def create_user(self, uid: str, display_name: str, key_type: str, access_key: str, secret_key: str, user_caps: str) -> Dict: 
+    def get_bucket_stats(self, uid: str) -> list[Dict[str, Any]]:
+        """
+        Thống kê mọi bucket của user trong 1 lần gọi: GET /admin/bucket?uid=&stats=true.
+        Số object / dung lượng lấy từ usage mà RGW tự duy trì (không liệt kê object).
+        Trả list dict: name, object_count, size_bytes, created_at, owner.
+        """
+        r = self.client.get("/bucket", {"uid": uid, "stats": "true"})
+        if r.status_code != 200:
+            raise RuntimeError(f"Cannot fetch bucket stats: {r.status_code} {r.text}")
+        data = r.json()
+        # Một số bản RGW trả dict khi chỉ có một bucket
+        buckets = data if isinstance(data, list) else [data]
+
+        results = []
+        for b in buckets:
+            if not isinstance(b, dict):
+                continue
+            # rgw.main: object hoàn chỉnh (rgw.multimeta là metadata của multipart đang upload)
+            usage = (b.get("usage") or {}).get("rgw.main") or {}
+            results.append({
+                "name": b.get("bucket"),
+                "object_count": usage.get("num_objects", 0),
+                "size_bytes": usage.get("size", 0),
+                "created_at": b.get("creation_time") or b.get("mtime"),
+                "owner": b.get("owner"),
+            })
+        return results
+
+    def create_user(self, uid: str, display_name: str, key_type: str, access_key: str, secret_key: str, user_caps: str) -> Dict: 
         params = {
             "uid" : uid,
             "display-name" : display_name,
@@ -134,7 +162,7 @@ class S3AdminService:
         info = self.client.get("/user",params={"format": "json", "uid": uid, "stats": "false"})
         info.raise_for_status()
 
-        return await info.json()
+        return info.json()
     
     def remove_user(self, uid: str) -> Dict[str, Any]:
         r = self.client.get("/user", {"uid": uid, "stats": "false"})
@@ -119,15 +119,26 @@ class S3Service:
 
     async def list_buckets(self, user_id: int) -> list[dict]:
         """
-        Liệt kê bucket + đếm object & tổng dung lượng.
+        Liệt kê bucket + số object & tổng dung lượng.
+        Mặc định lấy từ thống kê của RGW (1 lần gọi Admin Ops, không phụ thuộc số object);
+        S3_BUCKET_STATS_ENUMERATE=true thì dùng cách cũ: liệt kê toàn bộ object qua S3.
         Trả list[dict] theo shape S3BucketInfo.
         """
         account = await self.repository.find_by_user(user_id)
-        access_key = decrypt(account.access_key)
-        print(access_key)
         if not account:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No S3 account found")
+        if config.S3_BUCKET_STATS_ENUMERATE:
+            return await self._list_buckets_by_enumeration(account)
 
+        try:
+            return await run_in_threadpool(self.admin.get_bucket_stats, f"user-{user_id}")
+        except RuntimeError as e:
+            raise HTTPException(status.HTTP_502_BAD_GATEWAY, str(e))
+        except Exception as e:
+            raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"Cannot connect to Ceph admin endpoint: {e}")
+
+    async def _list_buckets_by_enumeration(self, account) -> list[dict]:
+        """Cách cũ: đếm object & dung lượng bằng list_objects_v2 trên từng bucket (O(số object))."""
         try:
             cfg = Config(
                 signature_version="s3v4",
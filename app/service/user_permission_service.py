@@ -3,6 +3,7 @@ from app.repository.user_permission_repository import UserPermissionRepository
 from app.model.user_permission import UserPermission
 from app.model.user import User
 from app.model.permission import Permission
+from app.core.permission_cache import invalidate_user_permissions
 from .user_service import UserService
 from .permission_service import PermissionService
 from app.schema.user_permission_schema import (
@@ -50,6 +51,7 @@ class UserPermissionService:
             })
 
         await self.repository.bulk_insert(user_permissions_to_add)
+        await invalidate_user_permissions(user.id)
         return assigned_permissions
 
     async def set_permission(self, user: User, permissions: list[Permission]) -> list:
@@ -69,6 +71,7 @@ class UserPermissionService:
             user_permissions.append(user_permission)
 
         await self.repository.bulk_insert(user_permissions)
+        await invalidate_user_permissions(user.id)
         return user_permissions
 
     async def find_permissions_by_user(self, user: User) -> list[UserPermission]:
@@ -126,6 +129,7 @@ class UserPermissionService:
             updated_permissions.append(user_permission)
 
         await self.repository.bulk_update(updated_permissions)
+        await invalidate_user_permissions(user.id)
         return [{"permission_id": up.permission_id, "status": "updated"} for up in updated_permissions]
 
     async def delete_permissions(self, data: UserPermissionsDelete) -> None:
@@ -156,6 +160,7 @@ class UserPermissionService:
         
         # Thực hiện xóa hàng loạt
         failed_deletes = await self.repository.bulk_delete(user_permissions_to_delete)
+        await invalidate_user_permissions(user.id)
         if failed_deletes:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
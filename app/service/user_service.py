@@ -2,10 +2,13 @@ from fastapi import HTTPException, status
 from app.repository.user_repository import UserRepository
 from app.schema.user_schema import UserCreate, UserUpdate
 from app.model.user import User
-from passlib.context import CryptContext
 from app.core.exceptions import DuplicateDataError
+from app.core import invalidation
+from app.core.cache import token_version_cache
+from app.core.password import password_hasher
+from app.core.utils import encode_cursor, decode_cursor
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_MISSING = object()
 
 
 class UserService:
@@ -17,6 +20,21 @@ class UserService:
         """Lấy danh sách người dùng đang hoạt động theo phân trang"""
         return await self.repository.get_active_users_paginated(page, limit)
 
+    async def get_active_users_page(self, limit: int, cursor: str | None = None) -> tuple[list, str | None]:
+        """Lấy một trang người dùng đang hoạt động theo cursor, trả về (users, cursor trang sau hoặc None)"""
+        after_id = None
+        if cursor:
+            try:
+                after_id = int(decode_cursor(cursor, "id")[0])
+            except (ValueError, TypeError, IndexError):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        users = await self.repository.get_active_users_after(after_id, limit + 1)
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor("id", [users[-1].id])
+        return users, next_cursor
+
     async def get_user_by_id(self, user_id: int):
         """Tìm người dùng theo ID (chỉ lấy user đang hoạt động)"""
         user = await self.repository.get_user_by_id(user_id)
@@ -40,7 +58,7 @@ class UserService:
 
     async def create_superadmin(self, password: str):
         """Tạo superadmin"""
-        hashed_password = pwd_context.hash(password)
+        hashed_password = await password_hasher.hash(password)
         new_user = User(username="superadmin", password=hashed_password)
         try:
             superadmin = await self.repository.create_user(new_user)
@@ -52,8 +70,9 @@ class UserService:
         """Thay đổi mật khẩu superadmin"""
         try:
             user = await self.get_user_by_username("superadmin")
-            user.password = pwd_context.hash(new_password)
+            user.password = await password_hasher.hash(new_password)
             await self.repository.update_user(user)
+            await self.invalidate_user_tokens(user.id)
             return True
         except Exception:
             return False
@@ -68,7 +87,7 @@ class UserService:
                 detail="Cannot create user with username: superadmin, admin"
             )
         # Hash mật khẩu trước khi tạo instance của User
-        data["password"] = pwd_context.hash(data["password"])
+        data["password"] = await password_hasher.hash(data["password"])
         # Sử dụng dictionary unpacking để map dữ liệu
         new_user = User(**data)
         try:
@@ -94,12 +113,49 @@ class UserService:
                 )
         # Nếu có cập nhật password thì hash lại mật khẩu
         if "password" in update_data:
-            update_data["password"] = pwd_context.hash(update_data["password"])
+            update_data["password"] = await password_hasher.hash(update_data["password"])
 
         # Cập nhật các trường có trong update_data vào instance User hiện tại
         for key, value in update_data.items():
             setattr(user, key, value)
-        return await self.repository.update_user(user)
+        user = await self.repository.update_user(user)
+        await self.invalidate_user_tokens(user.id)
+        return user
+
+    async def set_user_active(self, user_id: int, is_active: bool):
+        """Kích hoạt/khóa người dùng; token đã cache của người dùng bị hủy ngay"""
+        user = await self.repository.get_user_by_id(user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        if user.username == "superadmin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Cannot deactivate superadmin"
+            )
+        user.is_active = is_active
+        if not is_active:
+            # Thu hồi toàn bộ access token đã cấp
+            user.token_version = (user.token_version or 0) + 1
+        user = await self.repository.update_user(user)
+        await self.invalidate_user_tokens(user.id)
+        return user
+
+    async def get_token_version(self, user_id: int) -> int | None:
+        """
+        Lấy token_version hiện hành của user (có cache).
+        Trả về None nếu user không tồn tại hoặc đã bị khóa.
+        """
+        version = token_version_cache.get(user_id, _MISSING)
+        if version is _MISSING:
+            state = await self.repository.get_token_state(user_id)
+            version = state[1] if state and state[0] else None
+            token_version_cache.set(user_id, version)
+        return version
+
+    @staticmethod
+    async def invalidate_user_tokens(user_id: int) -> None:
+        """Xóa các token đã xác thực và token_version đã cache của người dùng (trên mọi worker)"""
+        await invalidation.publish("user_tokens", user_id)
 
     async def delete_user(self, user_id: int):
         """Xóa người dùng"""
@@ -109,12 +165,14 @@ class UserService:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Cannot delete superadmin"
             )
-        return await self.repository.delete_user(user)
+        success = await self.repository.delete_user(user)
+        await self.invalidate_user_tokens(user.id)
+        return success
 
     async def verify_user_password(self, username: str, password: str):
         """Kiểm tra mật khẩu đăng nhập"""
         user = await self.get_user_by_username(username)
-        if not pwd_context.verify(password, user.password):
+        if not await password_hasher.verify(password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="The password is incorrect"
@@ -123,10 +181,12 @@ class UserService:
 
     async def change_user_password(self, user: User, current_password: str, new_password: str):
         """Thay đổi mật khẩu người dùng"""
-        if not pwd_context.verify(current_password, user.password):
+        if not await password_hasher.verify(current_password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Incorrect current password"
             )
-        user.password = pwd_context.hash(new_password)
-        return await self.repository.update_user(user)
+        user.password = await password_hasher.hash(new_password)
+        user = await self.repository.update_user(user)
+        await self.invalidate_user_tokens(user.id)
+        return user
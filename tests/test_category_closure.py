@@ -0,0 +1,69 @@
+import asyncio
+import os
+import uuid
+import pytest
+
+# Cần Postgres thật: chạy với TEST_DATABASE_URL=postgresql+asyncpg://...
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL chưa được cấu hình", allow_module_level=True)
+
+import httpx
+from sqlalchemy import delete, select
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.main import app
+from app.model import all_models
+from app.model.category import Category
+from app.model.category_closure import CategoryClosure
+
+AUTH = {"Authorization": "Bearer token"}
+
+
+def test_create_and_move_category_over_http_updates_closure(signed_in):
+    """Tạo danh mục và chuyển cha qua HTTP: category_closure phản ánh đúng cây mới."""
+    granted, _ = signed_in
+    granted.update({"create_category", "edit_category"})
+    suffix = uuid.uuid4().hex[:8]
+
+    async def closure_of(ids):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(CategoryClosure.ancestor_id, CategoryClosure.descendant_id, CategoryClosure.depth)
+                .where(CategoryClosure.descendant_id.in_(ids))
+            )
+            return set(result.all())
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda conn: Base.metadata.create_all(conn, tables=[m.__table__ for m in all_models]))
+        ids = []
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                async def create(name, parent_id=None):
+                    response = await client.post(
+                        "/categories/", json={"name": f"{name} {suffix}", "parent_id": parent_id}, headers=AUTH
+                    )
+                    assert response.status_code == 201, response.text
+                    ids.append(response.json()["id"])
+                    return ids[-1]
+
+                a = await create("A")
+                b = await create("B")
+                c = await create("C", a)
+                assert await closure_of([a, b, c]) == {(a, a, 0), (b, b, 0), (c, c, 0), (a, c, 1)}
+
+                response = await client.put(f"/categories/{a}", json={"name": f"A {suffix}", "parent_id": b}, headers=AUTH)
+                assert response.status_code == 200, response.text
+                assert await closure_of([a, b, c]) == {
+                    (a, a, 0), (b, b, 0), (c, c, 0), (a, c, 1), (b, a, 1), (b, c, 2),
+                }
+
+                # Chuyển B vào cây con của chính nó (C) bị từ chối
+                response = await client.put(f"/categories/{b}", json={"name": f"B {suffix}", "parent_id": c}, headers=AUTH)
+                assert response.status_code == 400
+        finally:
+            async with AsyncSessionLocal() as session:
+                await session.execute(delete(Category).where(Category.id.in_(ids)).execution_options(synchronize_session=False))
+                await session.commit()
+            await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.controller import category_controller
+
+AUTH = {"Authorization": "Bearer token"}
+
+
+def test_delete_category_requires_permission(signed_in, monkeypatch):
+    """Xóa danh mục chuyển hàng loạt danh mục con và sản phẩm sang cha, nên phải có quyền delete_category."""
+    deleted = []
+
+    async def delete_category(category_id):
+        deleted.append(category_id)
+        return {"message": "Category deleted", "deleted": 1}
+
+    monkeypatch.setattr(category_controller.category_service, "delete_category", delete_category)
+    granted, checked = signed_in
+    client = TestClient(app)
+
+    assert client.delete("/categories/4", headers=AUTH).status_code == 403
+    assert deleted == [] and checked == [("delete_category", None)]
+
+    granted.add("delete_category")
+    assert client.delete("/categories/4", headers=AUTH).status_code == 200
+    assert deleted == [4]
+
+
+def test_create_and_move_category_maintain_closure(signed_in, monkeypatch):
+    """Controller dựng CategoryCreate/CategoryUpdate từ JSON, nên service chạy được tới bước cập nhật closure."""
+    from types import SimpleNamespace
+    from app.repository.category_repository import CategoryRepository
+    from app.service import category_service
+
+    closure = []
+
+    async def find_by_id(self, category_id):
+        return SimpleNamespace(id=category_id, name="Laptop", description=None, parent_id=None)
+
+    async def create_category(self, category):
+        category.id = 9
+        return category
+
+    async def update_category(self, category):
+        return category
+
+    async def is_descendant(self, category_id, ancestor_id):
+        return False
+
+    async def add_to_closure(self, category_id, parent_id):
+        closure.append(("add", category_id, parent_id))
+
+    async def move_in_closure(self, category_id, new_parent_id):
+        closure.append(("move", category_id, new_parent_id))
+
+    async def invalidate_category_tree():
+        pass
+
+    for name, fn in [("find_by_id", find_by_id), ("create_category", create_category), ("update_category", update_category),
+                     ("is_descendant", is_descendant), ("add_to_closure", add_to_closure), ("move_in_closure", move_in_closure)]:
+        monkeypatch.setattr(CategoryRepository, name, fn)
+    monkeypatch.setattr(category_service, "invalidate_category_tree", invalidate_category_tree)
+    granted, _ = signed_in
+    granted.update({"create_category", "edit_category"})
+    client = TestClient(app)
+
+    response = client.post("/categories/", json={"name": "Laptop", "parent_id": 2}, headers=AUTH)
+    assert response.status_code == 201 and response.json()["id"] == 9
+    response = client.put("/categories/5", json={"name": "Laptop", "parent_id": 3}, headers=AUTH)
+    assert response.status_code == 200 and response.json()["parent_id"] == 3
+    assert closure == [("add", 9, 2), ("move", 5, 3)]
+
+    assert client.post("/categories/", json={"name": "Laptop!"}, headers=AUTH).status_code == 422
+    assert client.put("/categories/5", json=["Laptop"], headers=AUTH).status_code == 422
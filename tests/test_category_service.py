@@ -0,0 +1,27 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.repository.category_repository import CategoryRepository
+from app.schema.category_schema import CategoryUpdate
+from app.service.category_service import CategoryService
+
+
+def test_update_category_rejects_move_into_own_subtree(monkeypatch):
+    """Kiểm tra vòng lặp đọc category_closure qua repository, không dùng snapshot cây trong bộ nhớ."""
+    calls = []
+
+    async def find_by_id(self, category_id):
+        return SimpleNamespace(id=category_id, parent_id=None)
+
+    async def is_descendant(self, category_id, ancestor_id):
+        calls.append((category_id, ancestor_id))
+        return True
+
+    monkeypatch.setattr(CategoryRepository, "find_by_id", find_by_id)
+    monkeypatch.setattr(CategoryRepository, "is_descendant", is_descendant)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(CategoryService().update_category(1, CategoryUpdate(id=1, name="Laptop", parent_id=5)))
+    assert error.value.status_code == 400
+    assert calls == [(5, 1)]
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.database import InstrumentedPool
+
+
+@pytest.mark.parametrize("max_overflow, waiting", [(-1, 0), (0, 1)])
+def test_pool_counts_waiters_only_when_checkout_blocks(monkeypatch, max_overflow, waiting):
+    """Pool rỗng: chỉ tính là đang chờ khi overflow có giới hạn và đã dùng hết."""
+    seen = []
+
+    def do_get(self):
+        seen.append(InstrumentedPool.waiters)
+        return object()
+
+    monkeypatch.setattr(AsyncAdaptedQueuePool, "_do_get", do_get)
+    pool = InstrumentedPool(object, pool_size=1, max_overflow=max_overflow)
+    pool._overflow = 0
+    pool._do_get()
+    assert seen == [waiting]
+    assert InstrumentedPool.waiters == 0
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import pytest
+
+# Cần Postgres thật (LISTEN/NOTIFY): chạy với TEST_DATABASE_URL=postgresql+asyncpg://...
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL chưa được cấu hình", allow_module_level=True)
+
+from app.core import config, invalidation
+
+
+def test_notify_delivered_after_heartbeat(monkeypatch):
+    """Sau nhịp heartbeat, listener vẫn nhận NOTIFY (không bị kẹt trong transaction)."""
+    monkeypatch.setattr(config, "CACHE_LISTENER_HEARTBEAT", 0.2)
+    received = []
+    invalidation.register("test_heartbeat", received.append)
+
+    async def scenario():
+        invalidation.start_listener()
+        try:
+            # Chờ listener kết nối và chạy qua vài heartbeat
+            await asyncio.sleep(1)
+            async with invalidation.AsyncSessionLocal() as session:
+                await session.execute(
+                    invalidation.text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": invalidation.CHANNEL, "payload": "other-worker|test_heartbeat|42"},
+                )
+                await session.commit()
+            for _ in range(50):
+                if received:
+                    break
+                await asyncio.sleep(0.1)
+        finally:
+            await invalidation.stop_listener()
+            await invalidation.engine.dispose()
+
+    asyncio.run(scenario())
+    assert received == ["42"]
@@ -0,0 +1,150 @@
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.repository.product_repository import ProductRepository
+
+PRODUCTS = [
+    SimpleNamespace(
+        id=id, name=f"Sản phẩm {id}", location_address="Hà Nội", category_id=None, description=None,
+        min_price=None, total_stock=0, discount_percentage=0, created_at=datetime(2025, 1, id),
+    )
+    for id in range(1, 6)
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Gọi qua toàn bộ app (middleware + router), thay repository bằng dữ liệu trong bộ nhớ."""
+    async def find_page_after(self, limit, after=None, newest=False, min_price=None, max_price=None, category_id=None):
+        rows = [p for p in PRODUCTS if after is None or p.id > after[0]]
+        return rows[:limit]
+
+    async def load_attribute_rows(self, product_ids):
+        return []
+
+    monkeypatch.setattr(ProductRepository, "find_page_after", find_page_after)
+    monkeypatch.setattr(ProductRepository, "load_attribute_rows", load_attribute_rows)
+    return TestClient(app)
+
+
+def test_list_products_follows_next_cursor(client):
+    seen, cursor = [], None
+    for _ in range(5):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/products", params=params)
+        assert response.status_code == 200
+        seen.extend(p["id"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [1, 2, 3, 4, 5]
+
+
+def test_list_products_rejects_cursor_of_other_sort(client):
+    cursor = client.get("/products", params={"limit": 2}).headers["X-Next-Cursor"]
+    response = client.get("/products", params={"limit": 2, "cursor": cursor, "sort": "newest"})
+    assert response.status_code == 400
+
+
+def test_autocomplete_route_served(monkeypatch):
+    from app.core.product_autocomplete import product_autocomplete
+
+    async def find_autocomplete_rows(self, product_ids=None):
+        rows = [(1, "Điện thoại Samsung", 5), (2, "Dien thoai Nokia", 9), (3, "Áo sơ mi", 1)]
+        return [row for row in rows if product_ids is None or row[0] in product_ids]
+
+    monkeypatch.setattr(ProductRepository, "find_autocomplete_rows", find_autocomplete_rows)
+    product_autocomplete.mark_stale()
+    response = TestClient(app).get("/products/autocomplete", params={"q": "điện th"})
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [2, 1]
+
+
+AUTH = {"Authorization": "Bearer token"}
+
+
+@pytest.mark.parametrize("method, path, permission, target_id", [
+    ("POST", "/products", "create_product", None),
+    ("PUT", "/products/3", "edit_product", 3),
+    ("DELETE", "/products/3", "delete_product", None),
+    ("POST", "/products/3/attribute", "edit_product", 3),
+    ("PUT", "/products/3/attribute", "edit_product", 3),
+])
+def test_product_writes_require_permission(signed_in, monkeypatch, method, path, permission, target_id):
+    """Đăng nhập nhưng không có quyền thì bị chặn trước khi chạm tới service."""
+    from app.controller import product_controller
+
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("service không được gọi khi thiếu quyền")
+
+    for name in ("create_product", "update_product", "delete_product", "update_or_create_product_attributes_and_options"):
+        monkeypatch.setattr(product_controller.product_service, name, unexpected)
+    _, checked = signed_in
+
+    response = TestClient(app).request(method, path, json={}, headers=AUTH)
+    assert response.status_code == 403
+    assert checked == [(permission, target_id)]
+
+
+class _CountingResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def scalars(self):
+        return self
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """
+    Chạy repository thật trên một session giả trả dữ liệu trong bộ nhớ và ghi lại
+    mọi câu lệnh gửi đi (mỗi lần execute là một câu SQL tới database).
+    """
+    from contextlib import asynccontextmanager
+    from app.model.product import Product
+    from app.model.product_attribute import ProductAttribute
+    from app.repository import product_repository
+
+    executed = []
+    # Mỗi sản phẩm có 2 thuộc tính, mỗi thuộc tính 2 giá trị: không được phát sinh truy vấn theo từng dòng
+    attribute_rows = [
+        (p.id, p.id * 10 + a, f"Thuộc tính {a}", f"Giá trị {v}") for p in PRODUCTS for a in (1, 2) for v in (1, 2)
+    ]
+
+    class Session:
+        async def execute(self, statement, params=None):
+            executed.append(statement)
+            entities = [column["entity"] for column in statement.column_descriptions]
+            if entities[0] is ProductAttribute:
+                return _CountingResult(attribute_rows)
+            if len(entities) == 2:
+                return _CountingResult([(p, 1.0 / p.id) for p in PRODUCTS])
+            return _CountingResult(PRODUCTS)
+
+    @asynccontextmanager
+    async def get_session(readonly=False):
+        yield Session()
+
+    monkeypatch.setattr(product_repository, "get_session", get_session)
+    return executed
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/products", {}),
+    ("/products", {"sort": "newest"}),
+    ("/products/search", {"q": "sản phẩm"}),
+    ("/products/by-category/3", {}),
+])
+@pytest.mark.parametrize("limit", [2, 4])
+def test_product_listing_statement_count(statements, path, params, limit):
+    """Một trang sản phẩm luôn tốn đúng 2 câu lệnh (trang sản phẩm + thuộc tính của cả trang), không phụ thuộc `limit`."""
+    response = TestClient(app).get(path, params={**params, "limit": limit})
+    assert response.status_code == 200
+    assert len(response.json()) == limit
+    assert all(len(p["attribute"]) == 2 for p in response.json())
+    assert len(statements) == 2
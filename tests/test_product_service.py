@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from app.model.product_attribute import ProductAttribute
+from app.model.product_option import variant_signature
+from app.repository import product_repository
+from app.repository.product_repository import ProductRepository
+from app.service.product_service import ProductService
+
+
+def test_empty_attribute_set_matches_default_option(monkeypatch):
+    """Không có giá trị thuộc tính nào thì tra option mặc định (variant_signature NULL), không phải md5("")."""
+    calls = []
+
+    async def find_option_by_signature(self, product_id, signature):
+        calls.append(signature)
+        return SimpleNamespace(id=7)
+
+    async def find_attribute_value_ids(self, product_id, names):
+        return [("Màu", "Đỏ", 3), ("Size", "M", 1)]
+
+    monkeypatch.setattr(ProductRepository, "find_option_by_signature", find_option_by_signature)
+    monkeypatch.setattr(ProductRepository, "find_attribute_value_ids", find_attribute_value_ids)
+    service = ProductService()
+    product = SimpleNamespace(id=1)
+
+    asyncio.run(service.find_option_by_attribute_values(product, []))
+    asyncio.run(service.find_product_option_by_json(product, "{}"))
+    asyncio.run(service.find_product_option_by_json(product, '{"Màu": "Đỏ", "Size": "M"}'))
+    assert calls == [None, None, variant_signature([1, 3])]
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class _FakeVariantSession:
+    """Session giả cho upsert_variant_matrix: trả option hiện có, ghi lại các câu UPDATE/INSERT."""
+
+    def __init__(self, existing, inserted):
+        self.existing, self.inserted = existing, inserted
+        self.updates, self.option_inserts, self.links = [], [], []
+
+    async def execute(self, statement, params=None):
+        if statement.is_select:
+            return _FakeResult(self.existing)
+        if statement.is_update:
+            self.updates.extend(params)
+            return _FakeResult([])
+        if statement.table.name == "product_options":
+            self.option_inserts.append(statement)
+            return _FakeResult(self.inserted)
+        self.links.append(statement)
+        return _FakeResult([])
+
+    async def commit(self):
+        pass
+
+
+def test_variant_matrix_normalised_and_counted(monkeypatch):
+    """
+    Giá làm tròn 2 chữ số, tồn kho ép int, tổ hợp lặp thì dòng sau thắng;
+    giá chỉ khác cách viết (10 so với "10.00") tính là không đổi.
+    """
+    attribute_ids = {("Màu",): 1, ("Size",): 2}
+    value_ids = {(1, "Đỏ"): 11, (1, "Xanh"): 12, (1, "Vàng"): 13, (2, "M"): 21}
+    red, blue, yellow = variant_signature([11, 21]), variant_signature([12, 21]), variant_signature([13, 21])
+    session = _FakeVariantSession(
+        existing=[(red, 101, Decimal("10"), 5), (blue, 102, Decimal("12.50"), 4)],
+        inserted=[(yellow, 103)],
+    )
+    captured = {}
+
+    @asynccontextmanager
+    async def get_session(readonly=False):
+        yield session
+
+    async def ensure_rows(session, model, key_columns, rows, scope):
+        return attribute_ids if model is ProductAttribute else value_ids
+
+    original_upsert = ProductRepository.upsert_variant_matrix
+
+    async def upsert_variant_matrix(self, product_id, attributes, variants):
+        captured.update(product_id=product_id, attributes=attributes, variants=variants)
+        return await original_upsert(self, product_id, attributes, variants)
+
+    async def get_product_by_id(self, product_id):
+        return SimpleNamespace(id=product_id)
+
+    async def refresh_option_summary(self, product):
+        return product
+
+    monkeypatch.setattr(product_repository, "get_session", get_session)
+    monkeypatch.setattr(ProductRepository, "_ensure_rows", staticmethod(ensure_rows))
+    monkeypatch.setattr(ProductRepository, "upsert_variant_matrix", upsert_variant_matrix)
+    monkeypatch.setattr(ProductService, "get_product_by_id", get_product_by_id)
+    monkeypatch.setattr(ProductService, "refresh_option_summary", refresh_option_summary)
+
+    counts = asyncio.run(ProductService().update_or_create_product_attributes_and_options(1, {
+        "attribute": ["Màu", "Size"],
+        "value": [
+            [["Đỏ", "M"], ["10.00", "5"]],
+            [["Xanh", "M"], [99, 1]],
+            [["Xanh", "M"], ["12.5", 3]],
+            [["Vàng", "M"], [7, 2.0]],
+        ],
+    }))
+
+    assert captured["attributes"] == ["Màu", "Size"]
+    assert captured["variants"] == {
+        ("Đỏ", "M"): (Decimal("10.00"), 5),
+        ("Xanh", "M"): (Decimal("12.50"), 3),
+        ("Vàng", "M"): (Decimal("7.00"), 2),
+    }
+    # Decimal("12.5") == Decimal("12.50") nên kiểm tra riêng số chữ số thập phân và kiểu của tồn kho
+    assert all(price.as_tuple().exponent == -2 and type(stock) is int for price, stock in captured["variants"].values())
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert session.updates == [{"id": 102, "price": Decimal("12.50"), "stock": 3}]
+    assert len(session.option_inserts) == 1 and len(session.links) == 1
+    assert session.links[0].compile().params == {"option_id_m0": 103, "attribute_value_id_m0": 13,
+                                                 "option_id_m1": 103, "attribute_value_id_m1": 21}
+
+
+@pytest.mark.parametrize("json_data", [
+    {"attribute": ["Màu", "Màu"], "value": [[["Đỏ", "Xanh"], [1, 1]]]},
+    {"attribute": ["1", 1], "value": [[["a", "b"], [1, 1]]]},
+    {"attribute": ["Màu"], "value": [[["Đỏ"], ["abc", 1]]]},
+    {"attribute": ["Màu"], "value": [[["Đỏ", "M"], [1, 1]]]},
+])
+def test_variant_matrix_rejected_before_writing(monkeypatch, json_data):
+    """Thuộc tính trùng tên, giá/tồn kho không phải số hay số giá trị lệch thì lỗi trước khi ghi."""
+    async def get_product_by_id(self, product_id):
+        return SimpleNamespace(id=product_id)
+
+    async def upsert_variant_matrix(self, product_id, attributes, variants):
+        raise AssertionError("không được ghi khi ma trận không hợp lệ")
+
+    monkeypatch.setattr(ProductService, "get_product_by_id", get_product_by_id)
+    monkeypatch.setattr(ProductRepository, "upsert_variant_matrix", upsert_variant_matrix)
+    with pytest.raises(ValueError):
+        asyncio.run(ProductService().update_or_create_product_attributes_and_options(1, json_data))